@@ -1,25 +1,55 @@
 from flask import Flask
 from config import Config
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_login import LoginManager
+from app.routing import RoutingSession
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login = LoginManager()
-login.login_view = "login"
+login.login_view = "main.login"
 
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_class)
 
+    from app import routing, sqlite
+    routing.configure(app)
+    sqlite.configure(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+    sqlite.init_app(app)
+
+    # Flask-Migrate pulls in alembic, a fifth of the import time, and only
+    # the `flask db` commands use it; web workers can turn it off
+    if app.config.get("REGISTER_MIGRATE", True):
+        from flask_migrate import Migrate
+        Migrate(app, db)
+
     login.init_app(app)
 
+    from app import templating
+    templating.init_app(app)
+
+    from app.user_cache import user_cache
+    user_cache.init_app(app)
+
+    from app.fragment_cache import fragment_cache
+    fragment_cache.init_app(app)
+
+    from app.instrumentation import instrumentation
+    instrumentation.init_app(app)
+
     from app.routes import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.booking_index import booking_index
+    booking_index.init_app(app)
+
+    from app.events import broker
+    broker.init_app(app)
+
     return app
 
@@ -0,0 +1,108 @@
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
+
+from app import db
+from app.choice_cache import bump
+from app.models import (
+    Booking,
+    CostLog,
+    ParticipantsPartner,
+    ParticipantsUser,
+    SlotClaim,
+    booking_archive,
+    cost_log_archive,
+    participants_partner_archive,
+    participants_user_archive,
+)
+
+# {live table: archive table}
+ARCHIVES = {
+    Booking.__table__: booking_archive,
+    CostLog.__table__: cost_log_archive,
+    ParticipantsUser.__table__: participants_user_archive,
+    ParticipantsPartner.__table__: participants_partner_archive,
+}
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+def archive_horizon(today=None):
+    """First day that stays in the live tables."""
+    days = current_app.config["ARCHIVE_AFTER_DAYS"]
+    if days < 1:
+        raise ArchiveError(f"ARCHIVE_AFTER_DAYS must be at least 1, not {days}")
+    today = today or date.today()
+    return today - timedelta(days=days)
+
+
+def archived_until(table):
+    """Day of the newest archived row of a live table, or None."""
+    archive = ARCHIVES[table]
+    newest = db.session.scalar(sa.select(sa.func.max(archive.c.date)))
+    return newest and newest.date()
+
+
+def with_archive(table, start=None):
+    """The live table, or its union with the archive when rows from
+    `start` on (all rows when None) may have been archived.
+
+    Query the result through `.c`, as the live table; SQLite pushes the
+    WHERE clauses down into both halves of the union.
+    """
+    until = archived_until(table)
+    if until is None or (start is not None and start > until):
+        return table
+    archive = ARCHIVES[table]
+    return sa.union_all(sa.select(table), sa.select(archive)).subquery(table.name)
+
+
+def _move(table, where):
+    columns = [column.name for column in table.columns]
+    db.session.execute(sa.insert(ARCHIVES[table]).from_select(columns, sa.select(table).where(where)))
+    return db.session.execute(sa.delete(table).where(where)).rowcount
+
+
+def _batches(model, cutoff, batch_size):
+    # Upper ids of successive batches of rows dated before cutoff. Both
+    # tables are AUTOINCREMENT, so archived ids are never handed out again.
+    while True:
+        batch = (
+            sa.select(model.id)
+            .where(model.date < cutoff)
+            .order_by(model.id)
+            .limit(batch_size)
+            .subquery()
+        )
+        upper = db.session.scalar(sa.select(sa.func.max(batch.c.id)))
+        if upper is None:
+            return
+        yield sa.and_(model.date < cutoff, model.id <= upper)
+
+
+def archive_before(cutoff, batch_size=None):
+    """Move bookings and cost logs dated before `cutoff` (a date) to the
+    archive tables, a batch at a time so bookings are not held up.
+
+    A booking's participants go with it and its slot claims are dropped.
+    """
+    cutoff = datetime.combine(cutoff, datetime.min.time())
+    batch_size = batch_size or current_app.config["ARCHIVE_BATCH_SIZE"]
+    moved = {"bookings": 0, "cost_logs": 0}
+
+    for where in _batches(Booking, cutoff, batch_size):
+        booking_ids = sa.select(Booking.id).where(where)
+        for model in (ParticipantsUser, ParticipantsPartner):
+            _move(model.__table__, model.booking_id.in_(booking_ids))
+        db.session.execute(sa.delete(SlotClaim).where(SlotClaim.booking_id.in_(booking_ids)))
+        moved["bookings"] += _move(Booking.__table__, where)
+        bump("booking", "participants_user", "participants_partner")
+        db.session.commit()
+
+    for where in _batches(CostLog, cutoff, batch_size):
+        moved["cost_logs"] += _move(CostLog.__table__, where)
+        db.session.commit()
+    return moved
@@ -0,0 +1,121 @@
+from datetime import date, datetime
+from threading import Lock
+
+import sqlalchemy as sa
+
+from app.occupancy import slot_mask
+from app.slot_claims import DELETED_USER
+
+
+class RoomDayBookings:
+    """Bookings of one room on one day and the bitmask of their slots."""
+
+    __slots__ = ("mask", "entries")
+
+    def __init__(self):
+        self.mask = 0
+        # {booking_id: (start, end, booking_id, booker)}
+        self.entries = {}
+
+    def collision(self, start, end):
+        wanted = slot_mask(start, end)
+        if not self.mask & wanted:
+            return None
+        # Only a clash pays for finding the booking behind it
+        for entry in self.entries.values():
+            if slot_mask(entry[0], entry[1]) & wanted:
+                return entry
+        return None
+
+    def add(self, start, end, booking_id, booker):
+        self.entries[booking_id] = (start, end, booking_id, booker)
+        self.mask |= slot_mask(start, end)
+
+    def remove(self, booking_id):
+        entry = self.entries.pop(booking_id, None)
+        if entry is None:
+            return False
+        self.mask &= ~slot_mask(entry[0], entry[1])
+        return True
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _day(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+class BookingIndex:
+    """Per-room, per-day slot masks of the bookings known to this worker.
+
+    Only a hint: it misses cancellations made by other workers, so a clash
+    it reports is confirmed against the slot claims before a request is
+    turned away, and the claims decide every conflict.
+    """
+
+    def __init__(self):
+        self._days = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        from app import db
+
+        with app.app_context():
+            if sa.inspect(db.engine).has_table("booking"):
+                self.rebuild()
+            else:
+                self.clear()
+
+    def rebuild(self):
+        from app import db
+        from app.models import Booking, User
+
+        rows = db.session.execute(
+            sa.select(
+                Booking.id,
+                Booking.room_id,
+                Booking.date,
+                Booking.start_time,
+                Booking.end_time,
+                sa.func.coalesce(User.fullname, DELETED_USER),
+            )
+            .outerjoin(User, Booking.user_id == User.id)
+            # new bookings cannot be made for past days
+            .where(Booking.date >= datetime.combine(date.today(), datetime.min.time()))
+        )
+        days = {}
+        for booking_id, room_id, day, start, end, booker in rows:
+            key = (room_id, _day(day))
+            days.setdefault(key, RoomDayBookings()).add(start, end, booking_id, booker)
+        with self._lock:
+            self._days = days
+
+    def clear(self):
+        with self._lock:
+            self._days = {}
+
+    def find_collision(self, room_id, date, start, end):
+        bookings = self._days.get((room_id, _day(date)))
+        if bookings is None:
+            return None
+        return bookings.collision(start, end)
+
+    def add(self, booking, booker):
+        key = (booking.room_id, _day(booking.date))
+        with self._lock:
+            self._days.setdefault(key, RoomDayBookings()).add(
+                booking.start_time, booking.end_time, booking.id, booker
+            )
+
+    def remove(self, booking):
+        self.discard(booking.room_id, booking.date, booking.id)
+
+    def discard(self, room_id, date, booking_id):
+        with self._lock:
+            bookings = self._days.get((room_id, _day(date)))
+            if bookings is not None:
+                bookings.remove(booking_id)
+
+
+booking_index = BookingIndex()
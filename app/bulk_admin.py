@@ -0,0 +1,115 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.choice_cache import bump
+from app.models import Booking, ParticipantsUser, Team, User, booking_archive
+from app.user_cache import user_cache
+
+
+class BulkAdminError(ValueError):
+    pass
+
+
+def _future_booking(column, owner):
+    # Correlated EXISTS, answered from the (user_id, date) or (team_id, date)
+    # index without reading any booking row
+    return sa.exists().where(column == owner, Booking.date > datetime.now())
+
+
+def _check_users(user_ids):
+    users = sa.select(User.username).where(User.id.in_(user_ids)).order_by(User.username)
+    if "admin" in db.session.scalars(users).all():
+        raise BulkAdminError("The admin user cannot be deleted")
+    blocked = db.session.scalars(users.where(_future_booking(Booking.user_id, User.id))).all()
+    if blocked:
+        raise BulkAdminError(f"Users hold future bookings: {', '.join(blocked)}")
+
+
+def _check_teams(team_ids):
+    teams = sa.select(Team.name).where(Team.id.in_(team_ids)).order_by(Team.name)
+    blocked = db.session.scalars(teams.where(_future_booking(Booking.team_id, Team.id))).all()
+    if blocked:
+        raise BulkAdminError(f"Teams hold future bookings: {', '.join(blocked)}")
+
+
+def _team_exists(team_id):
+    if db.session.get(Team, team_id) is None:
+        raise BulkAdminError(f"No team with id {team_id}")
+
+
+def _delete_users(condition):
+    # Past bookings keep the ids of their bookers, as cost logs keep the
+    # ids of deleted teams; only the participant rows are unlinked
+    members = sa.select(User.id).where(condition)
+    user_ids = db.session.scalars(members).all()
+    db.session.execute(
+        sa.update(ParticipantsUser)
+        .where(ParticipantsUser.user_id.in_(members))
+        .values(user_id=None)
+    )
+    db.session.execute(sa.delete(User).where(condition))
+    return user_ids
+
+
+def delete_users(user_ids):
+    """Delete the users in one transaction; none is deleted if any of
+    them holds a future booking. Returns the number deleted."""
+    user_ids = list(user_ids)
+    _check_users(user_ids)
+    deleted = _delete_users(User.id.in_(user_ids))
+    bump("user")
+    db.session.commit()
+    user_cache.invalidate(*deleted)
+    return len(deleted)
+
+
+def delete_teams(team_ids):
+    """Delete the teams and all their members in one transaction.
+
+    Returns (teams deleted, users deleted).
+    """
+    team_ids = list(team_ids)
+    _check_teams(team_ids)
+    _check_users(sa.select(User.id).where(User.team_id.in_(team_ids)))
+    deleted = _delete_users(User.team_id.in_(team_ids))
+    teams = db.session.execute(sa.delete(Team).where(Team.id.in_(team_ids))).rowcount
+    bump("user", "team")
+    db.session.commit()
+    user_cache.invalidate(*deleted)
+    return teams, len(deleted)
+
+
+def move_users(user_ids, team_id):
+    """Move the users to another team. Their bookings stay with the team
+    they were made for. Returns the number moved."""
+    user_ids = list(user_ids)
+    _team_exists(team_id)
+    moved = db.session.execute(
+        sa.update(User).where(User.id.in_(user_ids)).values(team_id=team_id)
+    ).rowcount
+    bump("user")
+    db.session.commit()
+    user_cache.invalidate(*user_ids)
+    return moved
+
+
+def merge_teams(team_ids, into_id):
+    """Merge the teams into another one: their members and bookings,
+    archived ones included, move over and the teams are deleted. Cost logs
+    keep the team that was billed. Returns the number of members moved.
+    """
+    team_ids = [team_id for team_id in team_ids if team_id != into_id]
+    _team_exists(into_id)
+    members = db.session.scalars(sa.select(User.id).where(User.team_id.in_(team_ids))).all()
+    db.session.execute(sa.update(User).where(User.team_id.in_(team_ids)).values(team_id=into_id))
+    for table in (Booking.__table__, booking_archive):
+        db.session.execute(
+            sa.update(table).where(table.c.team_id.in_(team_ids)).values(team_id=into_id)
+        )
+    db.session.execute(sa.delete(Team).where(Team.id.in_(team_ids)))
+    bump("user", "team", "booking")
+    db.session.commit()
+    user_cache.invalidate(*members)
+    return len(members)
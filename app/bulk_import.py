@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import sqlalchemy as sa
+from werkzeug.security import generate_password_hash
+
+from app import db
+from app.choice_cache import bump
+from app.models import Team, User
+
+FIELDS = ("username", "password", "fullname", "position", "team_name")
+
+
+class BulkImportError(ValueError):
+    pass
+
+
+def read_records(stream, fmt):
+    # stream yields text; fmt is "csv" or "json" (a list of objects)
+    if fmt == "csv":
+        records = list(csv.DictReader(stream))
+    elif fmt == "json":
+        try:
+            records = json.load(stream)
+        except ValueError as e:
+            raise BulkImportError(f"Invalid JSON: {e}") from None
+        if not isinstance(records, list):
+            raise BulkImportError("JSON import must be a list of users")
+    else:
+        raise BulkImportError(f"Unsupported import format: {fmt}")
+
+    for line, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            raise BulkImportError(f"Record {line} is not an object")
+        missing = [field for field in FIELDS if not record.get(field)]
+        if missing:
+            raise BulkImportError(f"Record {line} is missing {', '.join(missing)}")
+        not_text = [field for field in FIELDS if not isinstance(record[field], str)]
+        if not_text:
+            raise BulkImportError(f"Record {line} has non-text {', '.join(not_text)}")
+    return records
+
+
+def read_upload(storage):
+    fmt = os.path.splitext(storage.filename or "")[1].lstrip(".").lower()
+    return read_records(io.TextIOWrapper(storage.stream, encoding="utf-8"), fmt)
+
+
+def hash_passwords(passwords, workers=None):
+    # Password hashing is CPU bound and dominates the import, so spread it
+    # over a process pool instead of hashing in the calling thread.
+    if len(passwords) < 64 or workers == 1:
+        return [generate_password_hash(password) for password in passwords]
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(passwords) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def import_users(records, workers=None):
+    """Create the teams and users in `records` in one transaction.
+
+    Returns a dict with the number of users and teams created, the elapsed
+    seconds and the users-per-second throughput.
+    """
+    started = time.perf_counter()
+    usernames = [record["username"] for record in records]
+    if len(set(usernames)) != len(usernames):
+        raise BulkImportError("Usernames in the import are not unique")
+    existing = db.session.scalars(
+        sa.select(User.username).where(User.username.in_(usernames))
+    ).all()
+    if existing:
+        raise BulkImportError(f"Users already exist: {', '.join(sorted(existing))}")
+
+    hashes = hash_passwords([record["password"] for record in records], workers)
+
+    team_names = {record["team_name"] for record in records}
+    teams = dict(
+        db.session.execute(
+            sa.select(Team.name, Team.id).where(Team.name.in_(team_names))
+        ).all()
+    )
+    new_teams = sorted(team_names - teams.keys())
+    if new_teams:
+        db.session.execute(sa.insert(Team), [{"name": name} for name in new_teams])
+        teams.update(
+            db.session.execute(
+                sa.select(Team.name, Team.id).where(Team.name.in_(new_teams))
+            ).all()
+        )
+
+    db.session.execute(
+        sa.insert(User),
+        [
+            {
+                "username": record["username"],
+                "fullname": record["fullname"],
+                "position": record["position"],
+                "team_id": teams[record["team_name"]],
+                "password_hash": password_hash,
+            }
+            for record, password_hash in zip(records, hashes)
+        ],
+    )
+    bump("user", "team")
+    db.session.commit()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "users": len(records),
+        "teams": len(new_teams),
+        "seconds": elapsed,
+        "rate": len(records) / elapsed if elapsed else 0.0,
+    }
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.models import BookingChange, Room, Team, User
+
+CREATED = "created"
+CANCELLED = "cancelled"
+
+
+def record_change(action, booking):
+    # Added to the booking's own transaction, so the log and the bookings
+    # never disagree. SQLite has a single writer, so changes commit in
+    # sequence order and a reader never sees a gap that fills in later.
+    db.session.add(
+        BookingChange(
+            action=action,
+            booking_id=booking.id,
+            title=booking.title,
+            team_id=booking.team_id,
+            room_id=booking.room_id,
+            user_id=booking.user_id,
+            date=booking.date,
+            start_time=booking.start_time,
+            end_time=booking.end_time,
+        )
+    )
+
+
+def latest_seq():
+    return db.session.execute(sa.select(sa.func.max(BookingChange.seq))).scalar() or 0
+
+
+def day_version(date):
+    """Sequence number of the newest change to the bookings of a day, or 0.
+
+    It grows with every booking or cancellation on that day, whichever
+    worker made it.
+    """
+    midnight = datetime.combine(date, datetime.min.time())
+    return db.session.execute(
+        sa.select(sa.func.max(BookingChange.seq)).where(BookingChange.date == midnight)
+    ).scalar() or 0
+
+
+def changes_since(seq, limit):
+    """Up to `limit` changes after sequence number `seq`, oldest first."""
+    rows = db.session.execute(
+        sa.select(
+            BookingChange,
+            Room.name.label("room"),
+            Team.name.label("team"),
+            User.fullname.label("booker"),
+        )
+        .outerjoin(Room, BookingChange.room_id == Room.id)
+        .outerjoin(Team, BookingChange.team_id == Team.id)
+        .outerjoin(User, BookingChange.user_id == User.id)
+        .where(BookingChange.seq > seq)
+        .order_by(BookingChange.seq)
+        .limit(limit)
+    )
+    return [
+        {
+            "seq": change.seq,
+            "action": change.action,
+            "booking_id": change.booking_id,
+            "title": change.title,
+            "room_id": change.room_id,
+            "room": room,
+            "team_id": change.team_id,
+            "team": team,
+            "user_id": change.user_id,
+            "booker": booker,
+            "date": change.date.date().isoformat(),
+            "start_time": change.start_time,
+            "end_time": change.end_time,
+            "changed_at": change.changed_at.isoformat(),
+        }
+        for change, room, team, booker in rows
+    ]
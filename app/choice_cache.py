@@ -0,0 +1,50 @@
+import time
+
+import sqlalchemy as sa
+from flask import g
+from sqlalchemy.dialects.sqlite import insert
+
+from app import db
+from app.models import TableVersion
+
+# {key: (versions, choices)}, shared by every request of this process
+_choices = {}
+
+
+def table_versions():
+    # One read of the version table per request; the table lives in the
+    # database, so writes from any worker process are seen here.
+    if "table_versions" not in g:
+        g.table_versions = dict(
+            db.session.execute(sa.select(TableVersion.name, TableVersion.version)).all()
+        )
+    return g.table_versions
+
+
+def bump(*tables):
+    # Called in the writing transaction, before it commits. New rows start
+    # at the current time so a recreated database never reuses a version.
+    for table in tables:
+        stmt = insert(TableVersion).values(name=table, version=time.time_ns())
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[TableVersion.name],
+                set_={"version": TableVersion.version + 1},
+            )
+        )
+    g.pop("table_versions", None)
+
+
+def cached_choices(key, tables, build):
+    versions = table_versions()
+    current = tuple(versions.get(table) for table in tables)
+    cached = _choices.get(key)
+    if cached is not None and cached[0] == current:
+        return cached[1]
+    choices = build()
+    _choices[key] = (current, choices)
+    return choices
+
+
+def clear():
+    _choices.clear()
@@ -0,0 +1,91 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command("rebuild-cost-rollup")
+@with_appcontext
+def rebuild_cost_rollup_command():
+    """Rebuild the per-team daily cost rollup from cost_log and its archive."""
+    from app.costs import rebuild_cost_rollup
+
+    rows = rebuild_cost_rollup()
+    click.echo(f"Rebuilt cost rollup: {rows} team-day rows")
+
+
+@click.command("import-users")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json"]), help="Defaults to the file extension.")
+@click.option("--workers", type=int, default=None, help="Password hashing processes, defaults to all cores.")
+@with_appcontext
+def import_users_command(path, fmt, workers):
+    """Create teams and users from a CSV or JSON file in one transaction."""
+    import os
+
+    from app.bulk_import import BulkImportError, import_users, read_records
+
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    try:
+        with open(path, newline="", encoding="utf-8") as stream:
+            result = import_users(read_records(stream, fmt), workers=workers)
+    except BulkImportError as e:
+        raise click.ClickException(str(e))
+    click.echo(
+        f"Imported {result['users']} users and {result['teams']} new teams "
+        f"in {result['seconds']:.2f}s ({result['rate']:.0f} users/s)"
+    )
+
+
+@click.command("export")
+@click.argument("kind", type=click.Choice(["bookings", "costs"]))
+@click.option("--format", "fmt", type=click.Choice(["csv", "json"]), default="csv")
+@click.option("--start", type=click.DateTime(["%Y-%m-%d"]), help="First day, YYYY-MM-DD.")
+@click.option("--end", type=click.DateTime(["%Y-%m-%d"]), help="Last day, YYYY-MM-DD.")
+@click.option("--team", "team_id", type=int, help="Only this team id.")
+@click.option("--output", type=click.File("w", encoding="utf-8", lazy=True), default="-")
+@with_appcontext
+def export_command(kind, fmt, start, end, team_id, output):
+    """Stream bookings or cost logs to a CSV or JSON file."""
+    from app.export import export_chunks
+
+    chunks = export_chunks(kind, fmt, start and start.date(), end and end.date(), team_id)
+    for chunk in chunks:
+        output.write(chunk)
+
+
+@click.command("archive")
+@click.option("--days", type=click.IntRange(min=1), help="Archive before this many days ago, defaults to ARCHIVE_AFTER_DAYS.")
+@with_appcontext
+def archive_command(days):
+    """Move old bookings, participants and cost logs to the archive tables."""
+    from datetime import date, timedelta
+
+    from app.archive import ArchiveError, archive_before, archive_horizon
+
+    try:
+        cutoff = archive_horizon() if days is None else date.today() - timedelta(days=days)
+    except ArchiveError as e:
+        raise click.ClickException(str(e))
+    moved = archive_before(cutoff)
+    click.echo(f"Archived {moved['bookings']} bookings and {moved['cost_logs']} cost logs dated before {cutoff}")
+
+
+@click.command("compile-templates")
+@with_appcontext
+def compile_templates_command():
+    """Compile every template into the TEMPLATE_CACHE_DIR bytecode cache."""
+    from flask import current_app
+
+    from app.templating import compile_templates
+
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException("Set TEMPLATE_CACHE_DIR to compile templates ahead of time.")
+    names = compile_templates(current_app)
+    click.echo(f"Compiled {len(names)} templates into {current_app.config['TEMPLATE_CACHE_DIR']}")
+
+
+def register_commands(app):
+    app.cli.add_command(rebuild_cost_rollup_command)
+    app.cli.add_command(import_users_command)
+    app.cli.add_command(export_command)
+    app.cli.add_command(archive_command)
+    app.cli.add_command(compile_templates_command)
@@ -0,0 +1,50 @@
+import sqlalchemy as sa
+from sqlalchemy.dialects.sqlite import insert
+
+from app import db
+from app.archive import with_archive
+from app.models import CostLog, TeamDailyCost
+
+
+def record_cost(team_id, team_name, date, cost):
+    # Adds cost (negative when a booking is cancelled) to the team's rollup
+    # row for the day, inside the caller's transaction.
+    stmt = insert(TeamDailyCost).values(
+        team_id=team_id, team_name=team_name, date=date, cost=cost
+    )
+    db.session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[TeamDailyCost.team_id, TeamDailyCost.date],
+            set_={"cost": TeamDailyCost.cost + stmt.excluded.cost},
+        )
+    )
+
+
+def team_costs(start_date, end_date):
+    rows = db.session.execute(
+        sa.select(TeamDailyCost.team_name, sa.func.sum(TeamDailyCost.cost))
+        .where(TeamDailyCost.date >= start_date, TeamDailyCost.date <= end_date)
+        .group_by(TeamDailyCost.team_name)
+        .order_by(TeamDailyCost.team_name)
+    )
+    return [{"teamName": team_name, "total": total} for team_name, total in rows]
+
+
+def rebuild_cost_rollup():
+    cost_logs = with_archive(CostLog.__table__)
+    db.session.execute(sa.delete(TeamDailyCost))
+    db.session.execute(
+        sa.insert(TeamDailyCost).from_select(
+            ["team_id", "team_name", "date", "cost"],
+            sa.select(
+                cost_logs.c.team_id,
+                sa.func.max(cost_logs.c.team_name),
+                cost_logs.c.date,
+                sa.func.sum(cost_logs.c.cost),
+            )
+            .where(cost_logs.c.date.isnot(None))
+            .group_by(cost_logs.c.team_id, cost_logs.c.date),
+        )
+    )
+    db.session.commit()
+    return db.session.scalar(sa.select(sa.func.count()).select_from(TeamDailyCost))
@@ -0,0 +1,142 @@
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.changes import latest_seq
+from app.models import BookingChange, Room
+from app.occupancy import booking_masks, mask_row
+
+logger = logging.getLogger(__name__)
+
+
+def occupancy_events(since, day=None):
+    """Occupancy updates for the booking changes after sequence `since`.
+
+    Each update carries the whole row of the changed room and date as it
+    is now, so applying updates twice or out of date order is harmless.
+    """
+    query = (
+        sa.select(BookingChange, Room.name)
+        .outerjoin(Room, BookingChange.room_id == Room.id)
+        .where(BookingChange.seq > since)
+        .order_by(BookingChange.seq)
+    )
+    if day is not None:
+        query = query.where(BookingChange.date == datetime.combine(day, datetime.min.time()))
+    changes = db.session.execute(query).all()
+
+    masks = {}
+    for day in {change.date.date() for change, _ in changes}:
+        rooms = {change.room_id for change, _ in changes if change.date.date() == day}
+        masks.update(booking_masks(day, day, rooms))
+    return [
+        {
+            "seq": change.seq,
+            "action": change.action,
+            "date": change.date.date().isoformat(),
+            "room_id": change.room_id,
+            "room": room,
+            "title": change.title,
+            "start_time": change.start_time,
+            "end_time": change.end_time,
+            "slots": mask_row(masks.get((change.room_id, change.date.date()), 0)),
+        }
+        for change, room in changes
+    ]
+
+
+def format_event(event):
+    return f"id: {event['seq']}\nevent: occupancy\ndata: {json.dumps(event)}\n\n"
+
+
+class Subscription:
+    __slots__ = ("day", "queue", "dropped")
+
+    def __init__(self, day, maxsize):
+        self.day = day
+        self.queue = queue.Queue(maxsize)
+        # Set when the subscriber fell too far behind; it reconnects with
+        # Last-Event-ID and replays from the change log
+        self.dropped = False
+
+
+class OccupancyBroker:
+    """Fans booking changes out to server-sent event subscribers.
+
+    One poller per worker process reads the booking change log, so changes
+    committed by any process reach every subscriber, and idle subscribers
+    only wait on their queue. Run under a gevent worker the poller and the
+    subscribers are greenlets rather than threads.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.poll_interval = 1.0
+        self.queue_size = 100
+        self._subscribers = set()
+        self._poller = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.poll_interval = app.config.get("EVENTS_POLL_INTERVAL", self.poll_interval)
+        self.queue_size = app.config.get("EVENTS_QUEUE_SIZE", self.queue_size)
+
+    def subscribe(self, day):
+        # Called from a request, whose session reads the starting sequence
+        subscription = Subscription(day, self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+            if self._poller is None:
+                self._poller = threading.Thread(
+                    target=self._poll, args=(latest_seq(),), name="occupancy-events", daemon=True
+                )
+                self._poller.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, events):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for event in events:
+            for subscription in subscribers:
+                if subscription.dropped or subscription.day.isoformat() != event["date"]:
+                    continue
+                try:
+                    subscription.queue.put_nowait(event)
+                except queue.Full:
+                    subscription.dropped = True
+                    self.unsubscribe(subscription)
+
+    def _poll(self, last):
+        # Stops once the last subscriber has gone; the next subscribe
+        # starts a new poller.
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._poller = None
+                    return
+            events = []
+            with self.app.app_context():
+                try:
+                    events = occupancy_events(last)
+                except Exception:
+                    logger.exception("Polling the booking change log failed")
+                finally:
+                    db.session.remove()
+            if events:
+                last = events[-1]["seq"]
+                self.publish(events)
+            time.sleep(self.poll_interval)
+
+
+broker = OccupancyBroker()
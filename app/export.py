@@ -0,0 +1,132 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from app.archive import with_archive
+from app.models import Booking, CostLog, Room, Team, User
+from app.occupancy import format_time
+
+FORMATS = ("csv", "json")
+MIMETYPES = {"csv": "text/csv", "json": "application/json"}
+# Rows fetched from the cursor, and rows encoded per yielded chunk
+YIELD_PER = 1000
+
+
+def _midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+
+def _costs(start, end, team_id):
+    cost_logs = with_archive(CostLog.__table__, start)
+    query = sa.select(
+        cost_logs.c.id,
+        cost_logs.c.date,
+        cost_logs.c.title,
+        cost_logs.c.team_id,
+        cost_logs.c.team_name,
+        cost_logs.c.cost,
+    ).order_by(cost_logs.c.date, cost_logs.c.id)
+    if start is not None:
+        query = query.where(cost_logs.c.date >= _midnight(start))
+    if end is not None:
+        query = query.where(cost_logs.c.date <= _midnight(end))
+    if team_id:
+        query = query.where(cost_logs.c.team_id == team_id)
+    return query
+
+
+def _cost_row(row):
+    return (row.id, row.date.date().isoformat(), row.title, row.team_id, row.team_name, row.cost)
+
+
+def _bookings(start, end, team_id):
+    bookings = with_archive(Booking.__table__, start)
+    query = (
+        sa.select(
+            bookings.c.id,
+            bookings.c.date,
+            bookings.c.start_time,
+            bookings.c.end_time,
+            bookings.c.title,
+            Room.name.label("room"),
+            Team.name.label("team"),
+            User.fullname.label("booker"),
+        )
+        .outerjoin(Room, bookings.c.room_id == Room.id)
+        .outerjoin(Team, bookings.c.team_id == Team.id)
+        .outerjoin(User, bookings.c.user_id == User.id)
+        .order_by(bookings.c.date, bookings.c.id)
+    )
+    if start is not None:
+        query = query.where(bookings.c.date >= _midnight(start))
+    if end is not None:
+        query = query.where(bookings.c.date <= _midnight(end))
+    if team_id:
+        query = query.where(bookings.c.team_id == team_id)
+    return query
+
+
+def _booking_row(row):
+    return (
+        row.id,
+        row.date.date().isoformat(),
+        format_time(row.start_time),
+        format_time(row.end_time),
+        row.title,
+        row.room,
+        row.team,
+        row.booker,
+    )
+
+
+# {kind: (columns, query builder, row formatter)}
+EXPORTS = {
+    "costs": (("id", "date", "title", "team_id", "team_name", "cost"), _costs, _cost_row),
+    "bookings": (("id", "date", "start", "end", "title", "room", "team", "booker"), _bookings, _booking_row),
+}
+
+
+def export_rows(kind, start=None, end=None, team_id=None):
+    """Rows of an export, read from the database YIELD_PER at a time."""
+    _, build, format_row = EXPORTS[kind]
+    result = db.session.execute(build(start, end, team_id).execution_options(yield_per=YIELD_PER))
+    for row in result:
+        yield format_row(row)
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for number, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if number % YIELD_PER == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def json_chunks(columns, rows):
+    # One JSON array of objects, written piecewise
+    parts = ["["]
+    separator = ""
+    for row in rows:
+        parts.append(separator + json.dumps(dict(zip(columns, row))))
+        separator = ","
+        if len(parts) >= YIELD_PER:
+            yield "".join(parts)
+            parts = []
+    parts.append("]")
+    yield "".join(parts)
+
+
+def export_chunks(kind, fmt, start=None, end=None, team_id=None):
+    """Encoded chunks of an export; memory stays flat whatever the row count."""
+    columns = EXPORTS[kind][0]
+    rows = export_rows(kind, start, end, team_id)
+    return csv_chunks(columns, rows) if fmt == "csv" else json_chunks(columns, rows)
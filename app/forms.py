@@ -1,4 +1,5 @@
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import (
     StringField,
     PasswordField,
@@ -10,11 +11,18 @@ from wtforms import (
     SelectMultipleField,
     widgets,
 )
-from wtforms.validators import ValidationError, DataRequired, EqualTo
+from wtforms.validators import ValidationError, DataRequired, EqualTo, NumberRange, Optional
 from flask_login import current_user
+from app import db
+from app.choice_cache import cached_choices
 from app.models import Team, Booking, Room, BusinessPartner, User
+from app.occupancy import DAY_START, LAST_START, MAX_DURATION, SLOT_MINUTES, format_duration, format_time
 import datetime
 
+# Quarter-hour choices; values are minutes
+START_TIMES = [(minutes, format_time(minutes)) for minutes in range(DAY_START, LAST_START + 1, SLOT_MINUTES)]
+DURATIONS = [(minutes, format_duration(minutes)) for minutes in range(SLOT_MINUTES, MAX_DURATION + 1, SLOT_MINUTES)]
+
 
 class LoginForm(FlaskForm):
     username = StringField("Username", validators=[DataRequired()])
@@ -77,10 +85,22 @@ class AddUserForm(FlaskForm):
             raise ValidationError("Team name does not match, try again.")
 
 
+class ImportUsersForm(FlaskForm):
+    users = FileField(
+        "Users file (CSV or JSON)",
+        validators=[FileRequired(), FileAllowed(["csv", "json"], "CSV or JSON files only")],
+    )
+    submit = SubmitField("Import")
+
+
 class TeamChoiceIterable:
     def __iter__(self):
+        return iter(cached_choices("teams", ("team",), self.build))
+
+    @staticmethod
+    def build():
         teams = Team.query.filter(Team.name != "Admin").all()
-        return iter([(team.id, team.name) for team in teams])
+        return [(team.id, team.name) for team in teams]
 
 
 class DeleteTeamForm(FlaskForm):
@@ -90,19 +110,31 @@ class DeleteTeamForm(FlaskForm):
 
 class UserChoiceIterable:
     def __iter__(self):
-        users = User.query.all()
-        choices = [
-            (user.id, f"{user.fullname}, team {user.team.name}")
+        return iter(cached_choices("users", ("user", "team"), self.build))
+
+    @staticmethod
+    def build():
+        users = (
+            db.session.query(User.id, User.username, User.fullname, Team.name)
+            .join(Team, User.team_id == Team.id)
+            .order_by(User.id)
+            .all()
+        )
+        return [
+            (user.id, f"{user.fullname}, team {user.name}")
             for user in users
             if "admin" not in user.username.lower()
         ]
-        return iter(choices)
 
 
 class PartnerChoiceIterable:
     def __iter__(self):
+        return iter(cached_choices("partners", ("business_partner",), self.build))
+
+    @staticmethod
+    def build():
         partners = BusinessPartner.query.all()
-        return iter([(partner.id, f"{partner.name} from {partner.representing}") for partner in partners])
+        return [(partner.id, f"{partner.name} from {partner.representing}") for partner in partners]
 
 
 class DeleteUserForm(FlaskForm):
@@ -110,18 +142,53 @@ class DeleteUserForm(FlaskForm):
     submit = SubmitField("Delete")
 
 
+class BulkUsersForm(FlaskForm):
+    users = SelectMultipleField(
+        "Users",
+        coerce=int,
+        choices=UserChoiceIterable(),
+        option_widget=widgets.CheckboxInput(),
+        widget=widgets.ListWidget(prefix_label=False),
+        validators=[DataRequired()],
+    )
+    team = SelectField("Move to team", coerce=int, choices=TeamChoiceIterable())
+    move = SubmitField("Move")
+    delete = SubmitField("Delete")
+
+
+class MergeTeamsForm(FlaskForm):
+    teams = SelectMultipleField(
+        "Teams to merge",
+        coerce=int,
+        choices=TeamChoiceIterable(),
+        option_widget=widgets.CheckboxInput(),
+        widget=widgets.ListWidget(prefix_label=False),
+        validators=[DataRequired()],
+    )
+    into = SelectField("Merge into", coerce=int, choices=TeamChoiceIterable())
+    submit = SubmitField("Merge")
+
+    def validate_teams(self, teams):
+        if self.into.data in teams.data:
+            raise ValidationError("A team cannot be merged into itself.")
+
+
 class RoomChoiceIterable:
     def __iter__(self):
+        return iter(cached_choices("rooms", ("room",), self.build))
+
+    @staticmethod
+    def build():
         rooms = Room.query.all()
-        return iter([(room.id, room.name) for room in rooms])
+        return [(room.id, room.name) for room in rooms]
 
 
 class BookMeetingForm(FlaskForm):
     title = StringField("Meeting title", validators=[DataRequired()])
     room_id = SelectField("Choose room", coerce=int, choices=RoomChoiceIterable())
     date = DateField("Choose date", format="%m/%d/%Y", validators=[DataRequired()])
-    start_time = SelectField("Choose starting time", coerce=int, choices=[(i, i) for i in range(9, 19)])
-    duration = SelectField("Choose duration", coerce=int, choices=[(i, i) for i in range(1, 6)])
+    start_time = SelectField("Choose starting time", coerce=int, choices=START_TIMES)
+    duration = SelectField("Choose duration (h:mm)", coerce=int, choices=DURATIONS)
     participants_user = SelectMultipleField(
         "Company Participants",
         coerce=int,
@@ -150,11 +217,24 @@ class BookMeetingForm(FlaskForm):
 
 class MeetingChoiceIterable:
     def __iter__(self):
-        bookings = Booking.query.filter_by(booker_id=current_user.id).all()
-        return iter([
-            (b.id, f"{b.title} in {b.room.name} on {b.date.date()} from {b.start_time}")
+        user_id = current_user.id
+        return iter(
+            cached_choices(("meetings", user_id), ("booking", "room"), lambda: self.build(user_id))
+        )
+
+    @staticmethod
+    def build(user_id):
+        bookings = (
+            db.session.query(Booking.id, Booking.title, Booking.date, Booking.start_time, Room.name)
+            .join(Room, Booking.room_id == Room.id)
+            .filter(Booking.user_id == user_id)
+            .order_by(Booking.date, Booking.id)
+            .all()
+        )
+        return [
+            (b.id, f"{b.title} in {b.name} on {b.date.date()} from {format_time(b.start_time)}")
             for b in bookings
-        ])
+        ]
 
 
 class CancelBookingForm(FlaskForm):
@@ -164,23 +244,91 @@ class CancelBookingForm(FlaskForm):
 
 class RoomAvailableForm(FlaskForm):
     date = DateField("Choose date", format="%m/%d/%Y", validators=[DataRequired()])
-    start_time = SelectField("Choose starting time", coerce=int, choices=[(i, i) for i in range(9, 19)])
-    duration = SelectField("Choose duration", coerce=int, choices=[(i, i) for i in range(1, 6)])
+    start_time = SelectField("Choose starting time", coerce=int, choices=START_TIMES)
+    duration = SelectField("Choose duration (h:mm)", coerce=int, choices=DURATIONS)
     submit = SubmitField("Check")
 
 
+class RoomSearchForm(FlaskForm):
+    start_date = DateField("From", format="%m/%d/%Y", validators=[DataRequired()])
+    end_date = DateField("To", format="%m/%d/%Y", validators=[DataRequired()])
+    duration = SelectField("Choose duration (h:mm)", coerce=int, choices=DURATIONS)
+    capacity = IntegerField("Minimum capacity", default=0, validators=[Optional(), NumberRange(min=0)])
+    projector = BooleanField("Projector")
+    whiteboard = BooleanField("White board")
+    telephone = BooleanField("Telephone")
+    submit = SubmitField("Search")
+
+    def validate_end_date(self, end_date):
+        # an unparseable date already carries its own error
+        if end_date.data is None or self.start_date.data is None:
+            return
+        if end_date.data < self.start_date.data:
+            raise ValidationError("End Date must be after Start Date")
+        if (end_date.data - self.start_date.data).days > 366:
+            raise ValidationError("Search at most one year ahead")
+
+
 class RoomOccupationForm(FlaskForm):
     date = DateField("Choose date", format="%m/%d/%Y", validators=[DataRequired()])
     submit = SubmitField("Check")
 
 
+class AnyChoiceIterable:
+    def __init__(self, choices, label="All"):
+        self.choices = choices
+        self.label = label
+
+    def __iter__(self):
+        yield (0, self.label)
+        yield from self.choices
+
+
+class MeetingFilterForm(FlaskForm):
+    class Meta:
+        csrf = False
+
+    team = SelectField("Team", coerce=int, default=0, choices=AnyChoiceIterable(TeamChoiceIterable()))
+    room = SelectField("Room", coerce=int, default=0, choices=AnyChoiceIterable(RoomChoiceIterable()))
+    start_date = DateField("From", format="%m/%d/%Y", validators=[Optional()])
+    end_date = DateField("To", format="%m/%d/%Y", validators=[Optional()])
+    submit = SubmitField("Filter")
+
+
+class ExportForm(FlaskForm):
+    class Meta:
+        csrf = False
+
+    kind = SelectField("Export", choices=[("bookings", "Bookings"), ("costs", "Cost logs")])
+    format = SelectField("Format", choices=[("csv", "CSV"), ("json", "JSON")])
+    team = SelectField("Team", coerce=int, default=0, choices=AnyChoiceIterable(TeamChoiceIterable()))
+    start_date = DateField("From", format="%m/%d/%Y", validators=[Optional()])
+    end_date = DateField("To", format="%m/%d/%Y", validators=[Optional()])
+    submit = SubmitField("Download")
+
+
 class MeetingChoiceAllIterable:
     def __iter__(self):
-        bookings = Booking.query.all()
-        return iter([
-            (b.id, f"{b.title} in {b.room.name} on {b.date.date()} from {b.start_time}")
+        return iter(
+            cached_choices(
+                "meetings",
+                ("booking", "room"),
+                self.build,
+            )
+        )
+
+    @staticmethod
+    def build():
+        bookings = (
+            db.session.query(Booking.id, Booking.title, Booking.date, Booking.start_time, Room.name)
+            .join(Room, Booking.room_id == Room.id)
+            .order_by(Booking.date, Booking.id)
+            .all()
+        )
+        return [
+            (b.id, f"{b.title} in {b.name} on {b.date.date()} from {format_time(b.start_time)}")
             for b in bookings
-        ])
+        ]
 
 
 class MeetingParticipantsForm(FlaskForm):
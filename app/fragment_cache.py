@@ -0,0 +1,155 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from markupsafe import Markup
+
+
+def _day(value):
+    return (value.date() if isinstance(value, datetime) else value).isoformat()
+
+
+class MemoryBackend:
+    """LRU store private to one worker process."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, day, value):
+        with self._lock:
+            self._entries[key] = (day, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, day):
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0] == day]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Store in a local SQLite file shared by every worker process.
+
+    Entries beyond maxsize are evicted oldest stored first, so reads never
+    have to write.
+    """
+
+    def __init__(self, path, maxsize=256):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS fragment ("
+                "key TEXT PRIMARY KEY, day TEXT NOT NULL, value TEXT NOT NULL, stored REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_fragment_day ON fragment (day)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_fragment_stored ON fragment (stored)")
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value FROM fragment WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, day, value):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO fragment (key, day, value, stored) VALUES (?, ?, ?, ?)",
+                (key, day, value, time.time()),
+            )
+            connection.execute(
+                "DELETE FROM fragment WHERE key IN ("
+                "SELECT key FROM fragment ORDER BY stored DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def invalidate(self, day):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM fragment WHERE day = ?", (day,))
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM fragment")
+
+
+class FragmentCache:
+    """Rendered HTML fragments of the per-date room pages.
+
+    Entries are keyed by page, date and parameters, the date's version in
+    the booking change log and the room table version. A booking or
+    cancellation in any worker moves the date's version on, so every worker
+    misses the cache afterwards; book/cancel also drop the local entries of
+    the date to free them early. The version is read before rendering, so a
+    render racing a commit can only store newer HTML under the older key.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        backend = app.config.get("FRAGMENT_CACHE_BACKEND", "memory")
+        size = app.config.get("FRAGMENT_CACHE_SIZE", 256)
+        if backend == "memory":
+            self.backend = MemoryBackend(size)
+        elif backend == "sqlite":
+            self.backend = SQLiteBackend(app.config["FRAGMENT_CACHE_PATH"], size)
+        elif isinstance(backend, str):
+            raise ValueError(f"Unknown FRAGMENT_CACHE_BACKEND {backend!r}")
+        else:
+            # Any object with get/set/invalidate/clear
+            self.backend = backend
+
+    def render(self, page, date, params, render):
+        from app.changes import day_version
+        from app.choice_cache import table_versions
+
+        day = _day(date)
+        rooms = table_versions().get("room")
+        key = ":".join(str(part) for part in (page, day, *params, day_version(date), rooms))
+        html = self.backend.get(key)
+        if html is None:
+            self.misses += 1
+            html = render()
+            self.backend.set(key, day, html)
+        else:
+            self.hits += 1
+        return Markup(html)
+
+    def invalidate(self, date):
+        self.backend.invalidate(_day(date))
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+fragment_cache = FragmentCache()
@@ -0,0 +1,171 @@
+import logging
+import re
+import time
+from collections import Counter, deque
+from threading import Lock
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+from app import db
+
+logger = logging.getLogger(__name__)
+
+# Latency samples kept per endpoint for the quantiles
+SAMPLES = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+_IN_LIST = re.compile(r"IN \((?:\?|__\[POSTCOMPILE_\w+\])(?:, ?\?)*\)", re.IGNORECASE)
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement):
+    # Same shape of statement, whatever the literal values or IN list length
+    statement = _LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (?)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+class EndpointStats:
+    __slots__ = ("requests", "seconds", "statements", "sql_seconds", "n_plus_one", "slow_queries", "latencies", "queries")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.n_plus_one = 0
+        self.slow_queries = 0
+        self.latencies = deque(maxlen=SAMPLES)
+        self.queries = deque(maxlen=SAMPLES)
+
+
+def quantile(samples, fraction):
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class Instrumentation:
+    """Per-request SQL counting, N+1 detection and endpoint latency metrics.
+
+    Metrics are kept per worker process.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.slow_query_seconds = app.config.get("SQL_SLOW_QUERY_MS", 100) / 1000
+        self.n_plus_one_threshold = app.config.get("SQL_N_PLUS_ONE_THRESHOLD", 5)
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._before_execute)
+            event.listen(engine, "after_cursor_execute", self._after_execute)
+            event.listen(engine, "handle_error", self._on_error)
+        app.before_request(self._start_request)
+        app.teardown_request(self._finish_request)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        if elapsed >= self.slow_query_seconds:
+            logger.warning("Slow query (%.1fms): %s", elapsed * 1000, _SPACE.sub(" ", statement))
+        if not has_request_context() or "sql" not in g:
+            return
+        sql = g.sql
+        sql["statements"] += 1
+        sql["seconds"] += elapsed
+        sql["fingerprints"][fingerprint(statement)] += 1
+        if elapsed >= self.slow_query_seconds:
+            sql["slow"] += 1
+
+    def _on_error(self, context):
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+
+    def _start_request(self):
+        g.sql = {"statements": 0, "seconds": 0.0, "slow": 0, "fingerprints": Counter(), "started": time.perf_counter()}
+
+    def _finish_request(self, exc=None):
+        sql = g.pop("sql", None)
+        if sql is None:
+            return
+        elapsed = time.perf_counter() - sql["started"]
+        endpoint = request.endpoint or "unmatched"
+
+        repeated = [
+            (statement, times)
+            for statement, times in sql["fingerprints"].items()
+            if times >= self.n_plus_one_threshold
+        ]
+        for statement, times in repeated:
+            logger.warning("Possible N+1 in %s: %d x %s", endpoint, times, statement)
+
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.seconds += elapsed
+            stats.statements += sql["statements"]
+            stats.sql_seconds += sql["seconds"]
+            stats.n_plus_one += len(repeated)
+            stats.slow_queries += sql["slow"]
+            stats.latencies.append(elapsed)
+            stats.queries.append(sql["statements"])
+
+    def prometheus(self, extra=()):
+        """Endpoint aggregates in the Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            snapshot = [
+                (name, stats.requests, stats.seconds, stats.statements, stats.sql_seconds,
+                 stats.n_plus_one, stats.slow_queries, list(stats.latencies), list(stats.queries))
+                for name, stats in endpoints
+            ]
+
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def summary(name, help_text, samples_at, total_at):
+            header(name, "summary", help_text)
+            for row in snapshot:
+                for q in QUANTILES:
+                    value = quantile(row[samples_at], q)
+                    lines.append(f'{name}{{endpoint="{row[0]}",quantile="{q}"}} {value:g}')
+                lines.append(f'{name}_sum{{endpoint="{row[0]}"}} {row[total_at]:g}')
+                lines.append(f'{name}_count{{endpoint="{row[0]}"}} {row[1]}')
+
+        def counter(name, help_text, total_at):
+            header(name, "counter", help_text)
+            for row in snapshot:
+                lines.append(f'{name}{{endpoint="{row[0]}"}} {row[total_at]:g}')
+
+        summary("roombooking_request_duration_seconds", "Request latency by endpoint.", 7, 2)
+        summary("roombooking_sql_statements_per_request", "SQL statements issued per request by endpoint.", 8, 3)
+        counter("roombooking_sql_seconds_total", "Time spent executing SQL by endpoint.", 4)
+        counter(
+            "roombooking_n_plus_one_total",
+            "Statements repeated often enough in one request to suggest an N+1 pattern.",
+            5,
+        )
+        counter("roombooking_slow_queries_total", "Statements slower than SQL_SLOW_QUERY_MS.", 6)
+        for name, kind, help_text, value in extra:
+            header(name, kind, help_text)
+            lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+instrumentation = Instrumentation()
@@ -2,11 +2,12 @@ from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from app import login, db
+from app.user_cache import user_cache
 
 
 @login.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    return user_cache.get(int(user_id))
 
 
 class User(UserMixin, db.Model):
@@ -78,6 +79,14 @@ class Room(db.Model):
 
 class Booking(db.Model):
     __tablename__ = 'booking'
+    # AUTOINCREMENT so the id of an archived booking is never handed out
+    # again once the newer bookings are gone
+    __table_args__ = (
+        db.Index('ix_booking_date_room_id', 'date', 'room_id'),
+        db.Index('ix_booking_user_id_date', 'user_id', 'date'),
+        db.Index('ix_booking_team_id_date', 'team_id', 'date'),
+        {'sqlite_autoincrement': True},
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(64), nullable=False, unique=True)
@@ -90,41 +99,148 @@ class Booking(db.Model):
     end_time = db.Column(db.Integer, nullable=False)
     duration = db.Column(db.Integer, nullable=False)
 
+    # Participant rows go with their booking. Foreign keys are not enforced
+    # on our SQLite connections, so the ORM issues the cascaded delete.
+    participants_user = db.relationship(
+        'ParticipantsUser', backref='booking', cascade='all, delete-orphan'
+    )
+    participants_partner = db.relationship(
+        'ParticipantsPartner', backref='booking', cascade='all, delete-orphan'
+    )
+
     def __repr__(self):
         return f'<Booking {self.title} on {self.date.date()}>'
 
 
+class SlotClaim(db.Model):
+    __tablename__ = 'slot_claim'
+
+    # The primary key makes (room, date, slot) unique, so of two bookings
+    # racing for a slot only one insert can succeed
+    room_id = db.Column(db.Integer, db.ForeignKey('room.id'), primary_key=True)
+    date = db.Column(db.DateTime, primary_key=True)
+    slot = db.Column(db.Integer, primary_key=True)
+    booking_id = db.Column(
+        db.Integer, db.ForeignKey('booking.id', ondelete='CASCADE'), nullable=False, index=True
+    )
+
+    def __repr__(self):
+        return f'<SlotClaim room_id={self.room_id} {self.date.date()} slot={self.slot}>'
+
+
+class BookingChange(db.Model):
+    __tablename__ = 'booking_change'
+    # AUTOINCREMENT so a sequence number is never handed out twice, even
+    # after the newest rows are deleted. The date index (which carries seq
+    # as the rowid) answers day_version() without reading the table.
+    __table_args__ = (
+        db.Index('ix_booking_change_date', 'date'),
+        {'sqlite_autoincrement': True},
+    )
+
+    seq = db.Column(db.Integer, primary_key=True)
+    action = db.Column(db.String(16), nullable=False)
+    booking_id = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(64), nullable=False)
+    team_id = db.Column(db.Integer, nullable=False)
+    room_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    date = db.Column(db.DateTime, nullable=False)
+    start_time = db.Column(db.Integer, nullable=False)
+    end_time = db.Column(db.Integer, nullable=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<BookingChange {self.seq} {self.action} {self.title}>'
+
+
 class CostLog(db.Model):
     __tablename__ = 'cost_log'
+    # AUTOINCREMENT for the same reason as booking
+    __table_args__ = {'sqlite_autoincrement': True}
 
     id = db.Column(db.Integer, primary_key=True)
     team_id = db.Column(db.Integer, nullable=False)
     team_name = db.Column(db.String(64), nullable=False)
-    title = db.Column(db.String(64))
-    date = db.Column(db.DateTime)
+    title = db.Column(db.String(64), index=True)
+    date = db.Column(db.DateTime, index=True)
     cost = db.Column(db.Integer, nullable=False)
 
     def __repr__(self):
         return f'<CostLog {self.title} - {self.cost}>'
 
 
+class TeamDailyCost(db.Model):
+    __tablename__ = 'team_daily_cost'
+    __table_args__ = (db.UniqueConstraint('team_id', 'date'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, nullable=False)
+    team_name = db.Column(db.String(64), nullable=False)
+    date = db.Column(db.DateTime, nullable=False, index=True)
+    cost = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<TeamDailyCost {self.team_name} on {self.date.date()} - {self.cost}>'
+
+
 class ParticipantsUser(db.Model):
     __tablename__ = 'participants_user'
 
     id = db.Column(db.Integer, primary_key=True)
-    booking_title = db.Column(db.String(64), db.ForeignKey('booking.title'))
+    booking_id = db.Column(
+        db.Integer, db.ForeignKey('booking.id', ondelete='CASCADE'), nullable=False, index=True
+    )
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
 
     def __repr__(self):
-        return f'<ParticipantsUser user_id={self.user_id} booking={self.booking_title}>'
+        return f'<ParticipantsUser user_id={self.user_id} booking_id={self.booking_id}>'
 
 
 class ParticipantsPartner(db.Model):
     __tablename__ = 'participants_partner'
 
     id = db.Column(db.Integer, primary_key=True)
-    booking_title = db.Column(db.String(64), db.ForeignKey('booking.title'))
+    booking_id = db.Column(
+        db.Integer, db.ForeignKey('booking.id', ondelete='CASCADE'), nullable=False, index=True
+    )
     partner_id = db.Column(db.Integer, db.ForeignKey('business_partner.id'))
 
     def __repr__(self):
-        return f'<ParticipantsPartner partner_id={self.partner_id} booking={self.booking_title}>'
+        return f'<ParticipantsPartner partner_id={self.partner_id} booking_id={self.booking_id}>'
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+
+    name = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False)
+
+    def __repr__(self):
+        return f'<TableVersion {self.name} v{self.version}>'
+
+
+def _archive_table(table, *indexes):
+    # Same columns as the live table, without keys or constraints: archived
+    # rows are only ever inserted in bulk and read back by reports
+    columns = [db.Column(column.name, column.type, nullable=column.nullable) for column in table.columns]
+    return db.Table(f'{table.name}_archive', *columns, *indexes)
+
+
+booking_archive = _archive_table(
+    Booking.__table__,
+    db.Index('ix_booking_archive_date_room_id', 'date', 'room_id'),
+    db.Index('ix_booking_archive_team_id_date', 'team_id', 'date'),
+)
+cost_log_archive = _archive_table(
+    CostLog.__table__,
+    db.Index('ix_cost_log_archive_date', 'date'),
+)
+participants_user_archive = _archive_table(
+    ParticipantsUser.__table__,
+    db.Index('ix_participants_user_archive_booking_id', 'booking_id'),
+)
+participants_partner_archive = _archive_table(
+    ParticipantsPartner.__table__,
+    db.Index('ix_participants_partner_archive_booking_id', 'booking_id'),
+)
@@ -0,0 +1,170 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app import db
+from app.archive import with_archive
+from app.models import Booking, Room
+
+# Booking times are minutes after midnight. A room-day is a bitmask of 96
+# quarter-hour slots, bit i covering minutes [15 * i, 15 * (i + 1)).
+SLOT_MINUTES = 15
+SLOTS_PER_HOUR = 60 // SLOT_MINUTES
+SLOTS_PER_DAY = 24 * SLOTS_PER_HOUR
+# Bookable hours shown on the occupation grid
+DAY_START = 9 * 60
+DAY_END = 23 * 60
+# Latest start and longest duration offered by the booking form
+LAST_START = 18 * 60
+MAX_DURATION = 5 * 60
+
+
+def slot_range(start, end):
+    # Slots touched by [start, end)
+    return range(start // SLOT_MINUTES, -(-end // SLOT_MINUTES))
+
+
+def slot_mask(start, end):
+    slots = slot_range(start, end)
+    if not slots:
+        return 0
+    return ((1 << len(slots)) - 1) << slots.start
+
+
+OPEN_HOURS = slot_mask(DAY_START, DAY_END)
+START_SLOTS = slot_mask(DAY_START, LAST_START + SLOT_MINUTES)
+GRID_SLOTS = slot_range(DAY_START, DAY_END)
+
+
+def free_starts(mask, duration):
+    # Bits of the slots at which `duration` minutes of free open time begin.
+    # Runs of free slots are found by doubling: after each step `starts`
+    # marks the slots followed by `length` free ones.
+    free = ~mask & OPEN_HOURS
+    needed = len(slot_range(0, duration))
+    starts, length = free, 1
+    while length < needed:
+        step = min(length, needed - length)
+        starts &= starts >> step
+        length += step
+    return starts & START_SLOTS
+
+
+def mask_row(mask):
+    # Booked flag of every slot on the grid, from one bitwise extraction
+    bits = (mask >> GRID_SLOTS.start) & ((1 << len(GRID_SLOTS)) - 1)
+    return [bit == "1" for bit in reversed(format(bits, f"0{len(GRID_SLOTS)}b"))]
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def format_duration(minutes):
+    return f"{minutes // 60}:{minutes % 60:02d}"
+
+
+def _midnight(date):
+    return datetime.combine(date, datetime.min.time())
+
+
+def booking_masks(start_date, end_date, room_ids=None):
+    # {(room_id, date): bitset} for every booked room-day in the range
+    bookings = with_archive(Booking.__table__, start_date)
+    query = sa.select(
+        bookings.c.room_id, bookings.c.date, bookings.c.start_time, bookings.c.end_time
+    ).where(bookings.c.date >= _midnight(start_date), bookings.c.date <= _midnight(end_date))
+    if room_ids is not None:
+        query = query.where(bookings.c.room_id.in_(room_ids))
+    masks = {}
+    for room_id, date, start, end in db.session.execute(query):
+        key = (room_id, date.date())
+        masks[key] = masks.get(key, 0) | slot_mask(start, end)
+    return masks
+
+
+class OccupancyGrid:
+    """Rooms x slots occupancy of one day, one bitset per room."""
+
+    def __init__(self, date, rooms, masks):
+        self.date = date
+        self.rooms = rooms
+        self.masks = masks
+
+    @classmethod
+    def for_date(cls, date):
+        rooms = Room.query.order_by(Room.id).all()
+        masks = dict.fromkeys((room.id for room in rooms), 0)
+        for (room_id, _), mask in booking_masks(date, date).items():
+            masks[room_id] = mask
+        return cls(date, rooms, masks)
+
+    @property
+    def hours(self):
+        # Column headers, each spanning SLOTS_PER_HOUR slots
+        return range(DAY_START // 60, DAY_END // 60)
+
+    def free_rooms(self, start, end):
+        wanted = slot_mask(start, end)
+        return [room for room in self.rooms if not self.masks[room.id] & wanted]
+
+    def row(self, room_id):
+        return mask_row(self.masks.get(room_id, 0))
+
+
+def search_free_slots(
+    start_date,
+    end_date,
+    duration,
+    capacity=0,
+    projector=False,
+    whiteboard=False,
+    telephone=False,
+    limit=50,
+    now=None,
+):
+    """Earliest free slot of each matching room between two dates.
+
+    Only slots that have not begun by `now` (default: the current time)
+    are offered. Returns (date, start_time, room) tuples ordered by date
+    and time.
+    """
+    now = now or datetime.now()
+    start_date = max(start_date, now.date())
+    if start_date > end_date:
+        return []
+    # slots of today that have begun already
+    past = slot_mask(0, now.hour * 60 + now.minute + 1)
+
+    query = Room.query.filter(Room.capacity >= capacity)
+    if projector:
+        query = query.filter(Room.projector.is_(True))
+    if whiteboard:
+        query = query.filter(Room.whiteboard.is_(True))
+    if telephone:
+        query = query.filter(Room.telephone.isnot(None), Room.telephone != "")
+    rooms = query.order_by(Room.id).all()
+    if not rooms:
+        return []
+
+    masks = booking_masks(start_date, end_date, [room.id for room in rooms])
+    slots = []
+    pending = rooms
+    day = start_date
+    while pending and day <= end_date and len(slots) < limit:
+        still_pending = []
+        for room in pending:
+            starts = free_starts(masks.get((room.id, day), 0), duration)
+            if day == now.date():
+                starts &= ~past
+            if starts:
+                # lowest set bit is the earliest start of the day
+                slot = (starts & -starts).bit_length() - 1
+                slots.append((day, slot * SLOT_MINUTES, room))
+            else:
+                still_pending.append(room)
+        pending = still_pending
+        day += timedelta(days=1)
+
+    slots.sort(key=lambda slot: (slot[0], slot[1], slot[2].id))
+    return slots[:limit]
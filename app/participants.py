@@ -0,0 +1,53 @@
+import sqlalchemy as sa
+
+from app import db
+from app.models import BusinessPartner, ParticipantsPartner, ParticipantsUser, Team, User
+
+
+def user_label(fullname, team_name):
+    return f"{fullname} from {team_name}"
+
+
+def partner_label(name, representing):
+    return f"partner {name} from {representing}"
+
+
+def participants_for(booking_ids):
+    """Participant labels of several bookings, keyed by booking id.
+
+    Company participants come first, then partners, each in the order they
+    were added. Resolves everything in two joined queries.
+    """
+    booking_ids = list(booking_ids)
+    participants = {booking_id: [] for booking_id in booking_ids}
+    if not booking_ids:
+        return participants
+
+    users = db.session.execute(
+        sa.select(ParticipantsUser.booking_id, User.fullname, Team.name)
+        .join(User, ParticipantsUser.user_id == User.id)
+        .join(Team, User.team_id == Team.id)
+        .where(ParticipantsUser.booking_id.in_(booking_ids))
+        .order_by(ParticipantsUser.id)
+    )
+    for booking_id, fullname, team_name in users:
+        participants[booking_id].append(user_label(fullname, team_name))
+
+    partners = db.session.execute(
+        sa.select(
+            ParticipantsPartner.booking_id,
+            BusinessPartner.name,
+            BusinessPartner.representing,
+        )
+        .join(BusinessPartner, ParticipantsPartner.partner_id == BusinessPartner.id)
+        .where(ParticipantsPartner.booking_id.in_(booking_ids))
+        .order_by(ParticipantsPartner.id)
+    )
+    for booking_id, name, representing in partners:
+        participants[booking_id].append(partner_label(name, representing))
+    return participants
+
+
+def participants_of(booking):
+    return participants_for([booking.id])[booking.id]
+
@@ -1,24 +1,48 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
 from app import db
 from flask import current_app as app
 from datetime import datetime
+import hmac
+import queue
+from sqlalchemy import and_, or_
 
 from urllib.parse import urlparse as url_parse
 from app.forms import (
     RegistrationForm,
     LoginForm,
     AddUserForm,
+    ImportUsersForm,
     AddTeamForm,
     DeleteTeamForm,
     DeleteUserForm,
+    BulkUsersForm,
+    MergeTeamsForm,
     BookMeetingForm,
     CancelBookingForm,
     RoomAvailableForm,
     RoomOccupationForm,
+    RoomSearchForm,
     MeetingParticipantsForm,
+    MeetingFilterForm,
+    ExportForm,
     CostAccruedForm,
 )
+from app.archive import with_archive
+from app.booking_index import booking_index
+from app.bulk_admin import BulkAdminError, delete_teams, delete_users, merge_teams, move_users
+from app.changes import CANCELLED, CREATED, changes_since, latest_seq, record_change
+from app.choice_cache import bump
+from app.costs import record_cost, team_costs
+from app.events import broker, format_event, occupancy_events
+from app.fragment_cache import fragment_cache
+from app.instrumentation import instrumentation
+from app.occupancy import SLOTS_PER_HOUR, OccupancyGrid, format_duration, format_time, search_free_slots
+from app.participants import participants_of
+from app.routing import read_only
+from app.slot_claims import SlotTaken, claim_slots, holds_slots, release_slots
+from app.sqlite import retry_on_busy
+from app.user_cache import user_cache
 from app.models import (
     Team,
     Booking,
@@ -27,10 +51,11 @@ from app.models import (
     CostLog,
     ParticipantsUser,
     ParticipantsPartner,
-    BusinessPartner,
 )
 
 bp = Blueprint("main", __name__)
+bp.add_app_template_filter(format_time, "clock")
+bp.add_app_template_filter(format_duration, "hm")
 
 @bp.route("/")
 @bp.route("/index")
@@ -41,17 +66,17 @@ def index():
 @bp.route("/login", methods=["GET", "POST"])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = LoginForm()
     if form.validate_on_submit():
         user = User.query.filter_by(username=form.username.data).first()
         if user is None or not user.check_password(form.password.data):
             flash("Invalid username or password")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get("next")
         if not next_page or url_parse(next_page).netloc != "":
-            next_page = url_for("index")
+            next_page = url_for("main.index")
         return redirect(next_page)
     return render_template("login.html", title="Sign In", form=form)
 
@@ -59,393 +84,590 @@ def login():
 @bp.route("/logout")
 def logout():
     logout_user()
-    return redirect(url_for("index"))
+    return redirect(url_for("main.index"))
 
 
 @bp.route("/register", methods=["GET", "POST"])
+@retry_on_busy
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = RegistrationForm()
     if form.validate_on_submit():
         user = User(
             username=form.username.data,
             fullname=form.fullname.data,
             position=form.position.data,
-            teamId=form.teamId.data,
+            team_id=form.team_id.data,
         )
         user.set_password(form.password.data)
         db.session.add(user)
-        team = Team.query.filter_by(id=user.teamId).first()
+        team = Team.query.get(user.team_id)
         if team is None:
-            newTeam = Team(id=user.teamId, teamName=form.teamName.data)
+            newTeam = Team(id=user.team_id, name=form.team_name.data)
             db.session.add(newTeam)
+            bump("user", "team")
             db.session.commit()
             flash("Registered with a new team created")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
         else:
+            bump("user")
             db.session.commit()
             flash("Registered to an existing team")
-            return redirect(url_for("login"))
+            return redirect(url_for("main.login"))
     return render_template("register.html", title="Register", form=form)
 
 
 @bp.route("/adduser", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def adduser():
     if not current_user.is_authenticated:
         flash("Please Log in as admin to add user")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     if current_user.username != "admin":
         flash("Please Log in as admin to add user")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = AddUserForm()
     if form.validate_on_submit():
         user = User(
             username=form.username.data,
             fullname=form.fullname.data,
             position=form.position.data,
-            teamId=form.teamId.data,
+            team_id=form.team_id.data,
         )
         user.set_password(form.password.data)
         db.session.add(user)
-        team = Team.query.filter_by(id=user.teamId).first()
+        team = Team.query.get(user.team_id)
         if team is None:
-            newTeam = Team(id=user.teamId, teamName=form.teamName.data)
+            newTeam = Team(id=user.team_id, name=form.team_name.data)
             db.session.add(newTeam)
+            bump("user", "team")
             db.session.commit()
             flash(f"Added user {form.username.data} with a new team created")
-            return redirect(url_for("adduser"))
+            return redirect(url_for("main.adduser"))
         else:
+            bump("user")
             db.session.commit()
             flash(f"Added user {form.username.data} to an existing team")
-            return redirect(url_for("adduser"))
+            return redirect(url_for("main.adduser"))
     return render_template("adduser.html", title="Add User", form=form)
 
 
+@bp.route("/importusers", methods=["GET", "POST"])
+@login_required
+def importusers():
+    if current_user.username != "admin":
+        flash("Please Log in as admin to import users")
+        return redirect(url_for("main.index"))
+    form = ImportUsersForm()
+    if form.validate_on_submit():
+        # imported here: only this view needs the process pool machinery
+        from app.bulk_import import BulkImportError, import_users, read_upload
+
+        try:
+            # the upload can be read only once, so retry just the import
+            records = read_upload(form.users.data)
+            result = retry_on_busy(import_users)(records)
+        except BulkImportError as e:
+            db.session.rollback()
+            flash(f"Import failed: {e}")
+            return redirect(url_for("main.importusers"))
+        flash(
+            f"Imported {result['users']} users and {result['teams']} new teams "
+            f"in {result['seconds']:.2f}s ({result['rate']:.0f} users/s)"
+        )
+        return redirect(url_for("main.importusers"))
+    return render_template("importusers.html", title="Import Users", form=form)
+
+
 @bp.route("/addteam", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def addteam():
     if not current_user.is_authenticated:
         flash("Please Log in as admin to add team")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     if current_user.username != "admin":
         flash("Please Log in as admin to add team")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = AddTeamForm()
     if form.validate_on_submit():
-        team = Team(id=form.id.data, teamName=form.teamName.data)
+        team = Team(id=form.id.data, name=form.name.data)
         db.session.add(team)
+        bump("team")
         db.session.commit()
-        flash(f"Team {form.teamName.data} successfully added!")
-        return redirect(url_for("addteam"))
+        flash(f"Team {form.name.data} successfully added!")
+        return redirect(url_for("main.addteam"))
     return render_template("addteam.html", title="Add Team", form=form)
 
 
 @bp.route("/deleteteam", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def deleteteam():
     if not current_user.is_authenticated:
         flash("Please Log in as admin to delete team")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     if current_user.username != "admin":
         flash("Please Log in as admin to delete team")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = DeleteTeamForm()
 
     if form.validate_on_submit():
-        team = Team.query.filter_by(id=form.ids.data).first()
-
-        bookings = Booking.query.filter_by(teamId=team.id).all()
-        has_future_booking = False
-        for booking in bookings:
-            if booking.date > datetime.now():
-                has_future_booking = True
-                break
-        if has_future_booking:
-            flash("You cannot delete a team that holds future bookings!")
-            return redirect(url_for("deleteteam"))
-
-        # delete all users in a deleted team
-        userInTeam = User.query.filter_by(teamId=form.ids.data).all()
-        for user in userInTeam:
-            db.session.delete(user)
-        db.session.delete(team)
-        db.session.commit()
+        team = db.session.get(Team, form.ids.data)
+        try:
+            # the team and all its members, in one transaction
+            delete_teams([team.id])
+        except BulkAdminError as e:
+            db.session.rollback()
+            flash(f"You cannot delete this team. {e}")
+            return redirect(url_for("main.deleteteam"))
         flash(
-            f"Team {team.teamName} and team members successfully deleted! Please register member again to other team"
+            f"Team {team.name} and team members successfully deleted! Please register member again to other team"
         )
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     form = DeleteTeamForm()
     return render_template("deleteteam.html", title="Delete Team", form=form)
 
 
 @bp.route("/deleteuser", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def deleteuser():
     if not current_user.is_authenticated:
         flash("Please Log in as admin to delete user")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
     if current_user.username != "admin":
         flash("Please Log in as admin to delete user")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
 
     form = DeleteUserForm()
     if form.validate_on_submit():
-        user = User.query.filter_by(id=form.ids.data).first()
-
-        bookings = Booking.query.filter_by(bookerId=user.id).all()
-        has_future_booking = False
-        for booking in bookings:
-            if booking.date > datetime.now():
-                has_future_booking = True
-                break
-        if has_future_booking:
-            flash("You cannot delete a user that holds future bookings!")
-            return redirect(url_for("deleteuser"))
-
-        db.session.delete(user)
-        db.session.commit()
+        user = db.session.get(User, form.ids.data)
+        try:
+            delete_users([user.id])
+        except BulkAdminError as e:
+            db.session.rollback()
+            flash(f"You cannot delete this user. {e}")
+            return redirect(url_for("main.deleteuser"))
         flash(f"User {user.username} successfully deleted! ")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     return render_template("deleteuser.html", title="Delete User", form=form)
 
 
+@bp.route("/bulkusers", methods=["GET", "POST"])
+@login_required
+@retry_on_busy
+def bulkusers():
+    if current_user.username != "admin":
+        flash("Please Log in as admin to manage users")
+        return redirect(url_for("main.index"))
+    form = BulkUsersForm()
+    if form.validate_on_submit():
+        try:
+            if form.delete.data:
+                count = delete_users(form.users.data)
+                flash(f"{count} users successfully deleted!")
+            else:
+                count = move_users(form.users.data, form.team.data)
+                flash(f"{count} users successfully moved!")
+        except BulkAdminError as e:
+            db.session.rollback()
+            flash(f"Nothing changed. {e}")
+        return redirect(url_for("main.bulkusers"))
+    return render_template("bulkusers.html", title="Manage Users", form=form)
+
+
+@bp.route("/mergeteams", methods=["GET", "POST"])
+@login_required
+@retry_on_busy
+def mergeteams():
+    if current_user.username != "admin":
+        flash("Please Log in as admin to merge teams")
+        return redirect(url_for("main.index"))
+    form = MergeTeamsForm()
+    if form.validate_on_submit():
+        try:
+            members = merge_teams(form.teams.data, form.into.data)
+        except BulkAdminError as e:
+            db.session.rollback()
+            flash(f"Nothing changed. {e}")
+            return redirect(url_for("main.mergeteams"))
+        flash(f"{len(form.teams.data)} teams merged, {members} members moved!")
+        return redirect(url_for("main.mergeteams"))
+    return render_template("mergeteams.html", title="Merge Teams", form=form)
+
+
 @bp.route("/book", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def book():
     form = BookMeetingForm()
     if form.validate_on_submit():
-        # check time collision
-        bookingcollisions = (
-            Booking.query.filter_by(
-                date=datetime.combine(form.date.data, datetime.min.time())
+        date = datetime.combine(form.date.data, datetime.min.time())
+        start_time = form.start_time.data
+        end_time = start_time + form.duration.data
+
+        # Fast path: clashes this worker already knows about are turned
+        # away without opening a write transaction. The index does not hear
+        # of cancellations in other workers, so a clash only counts while
+        # the booking behind it still holds its slots.
+        collision = booking_index.find_collision(form.room_id.data, date, start_time, end_time)
+        while collision is not None and not holds_slots(collision[2]):
+            booking_index.discard(form.room_id.data, date, collision[2])
+            collision = booking_index.find_collision(form.room_id.data, date, start_time, end_time)
+        if collision is not None:
+            collision_start, collision_end, _, booker_name = collision
+            flash(
+                f"The time from {format_time(collision_start)} to {format_time(collision_end)}"
+                f" is already booked by {booker_name}."
             )
-            .filter_by(roomId=form.rooms.data)
-            .all()
-        )
-        print(len(bookingcollisions))
-        for bookingcollision in bookingcollisions:
-            # [a, b] overlaps with [x, y] iff b > x and a < y
-            if (
-                form.startTime.data < bookingcollision.endTime
-                and (form.startTime.data + form.duration.data)
-                > bookingcollision.startTime
-            ):
-                flash(
-                    f"The time from {bookingcollision.startTime} to {bookingcollision.endTime} is already booked by {User.query.filter_by(id=bookingcollision.bookerId).first().fullname}."
-                )
-                return redirect(url_for("book"))
+            return redirect(url_for("main.book"))
 
         # make booking
-        booker = current_user
-
-        team = Team.query.filter_by(id=current_user.teamId).first()
-        room = Room.query.filter_by(id=form.rooms.data).first()
-        cost = room.cost
-        endTime = form.startTime.data + form.duration.data
-
-        participants_user = form.participants_user.data
-        participants_partner = form.participants_partner.data
+        team = current_user.team
+        room = Room.query.get(form.room_id.data)
 
         booking = Booking(
             title=form.title.data,
-            teamId=team.id,
-            roomId=room.id,
-            bookerId=booker.id,
-            date=form.date.data,
-            startTime=form.startTime.data,
-            endTime=endTime,
+            team_id=team.id,
+            room_id=room.id,
+            user_id=current_user.id,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
             duration=form.duration.data,
         )
         db.session.add(booking)
+        db.session.flush()
+
+        # The authoritative check: inserting the slot claims fails if any
+        # other booking, from any worker, holds one of the slots
+        try:
+            claim_slots(booking)
+        except SlotTaken as taken:
+            flash(str(taken))
+            return redirect(url_for("main.book"))
 
         # Add booking log
         log = CostLog(
             title=form.title.data,
-            teamId=team.id,
-            teamName=team.teamName,
-            date=form.date.data,
-            cost=cost * form.duration.data,
+            team_id=team.id,
+            team_name=team.name,
+            date=date,
+            # rooms are priced per hour
+            cost=round((room.cost or 0) * form.duration.data / 60),
         )
         db.session.add(log)
+        record_cost(team.id, team.name, date, log.cost)
 
         # Add participants records
-        for participant in participants_user:
-            participating = ParticipantsUser(
-                meeting=form.title.data, userId=participant
-            )
-            db.session.add(participating)
-        for participant in participants_partner:
-            participating = ParticipantsPartner(
-                meeting=form.title.data, partnerId=participant
-            )
-            db.session.add(participating)
-
+        booking.participants_user = [
+            ParticipantsUser(user_id=participant)
+            for participant in form.participants_user.data
+        ]
+        booking.participants_partner = [
+            ParticipantsPartner(partner_id=participant)
+            for participant in form.participants_partner.data
+        ]
+        record_change(CREATED, booking)
+
+        bump("booking", "participants_user", "participants_partner")
         db.session.commit()
+        booking_index.add(booking, current_user.fullname)
+        fragment_cache.invalidate(booking.date)
         flash("Booking success!")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     return render_template("book.html", title="Book Meeting", form=form)
 
 
 @bp.route("/cancelbooking", methods=["GET", "POST"])
 @login_required
+@retry_on_busy
 def cancelbooking():
     if not current_user.is_authenticated:
         flash("Please Log in to cancel booking")
-        return redirect(url_for("login"))
+        return redirect(url_for("main.login"))
 
     form = CancelBookingForm()
     if form.validate_on_submit():
-        booking = Booking.query.filter_by(id=form.ids.data).first()
+        booking = Booking.query.get(form.ids.data)
 
         if booking.date <= datetime.now():
             flash("Past booking cannot be canceled")
-            return redirect(url_for("cancelbooking"))
-
-        participants_user = ParticipantsUser.query.filter_by(
-            meeting=booking.title
-        ).all()
-        for part in participants_user:
-            db.session.delete(part)
-        participants_partner = ParticipantsPartner.query.filter_by(
-            meeting=booking.title
-        ).all()
-        for part in participants_partner:
-            db.session.delete(part)
+            return redirect(url_for("main.cancelbooking"))
+
+        release_slots(booking.id)
 
         costlog = CostLog.query.filter_by(title=booking.title).first()
-        db.session.delete(costlog)
+        if costlog is not None:
+            record_cost(costlog.team_id, costlog.team_name, costlog.date, -costlog.cost)
+            db.session.delete(costlog)
 
+        record_change(CANCELLED, booking)
         db.session.delete(booking)
+        bump("booking", "participants_user", "participants_partner")
         db.session.commit()
+        booking_index.remove(booking)
+        fragment_cache.invalidate(booking.date)
         flash(f"Meeting {booking.title} successfully deleted! ")
-        return redirect(url_for("index"))
+        return redirect(url_for("main.index"))
     return render_template("cancelbooking.html", title="Cancel Booking", form=form)
 
 
 @bp.route("/roomavailable", methods=["GET", "POST"])
+@read_only
 def roomavailable():
     form = RoomAvailableForm()
     if form.validate_on_submit():
-        bookings = Booking.query.filter_by(
-            date=datetime.combine(form.date.data, datetime.min.time())
-        ).all()
-        roomsOccupied = set()
-        for booking in bookings:
-            if (
-                form.startTime.data < booking.endTime
-                and (form.startTime.data + form.duration.data) > booking.startTime
-            ):
-                roomsOccupied.add(Room.query.filter_by(id=booking.roomId).first())
-        rooms = Room.query.all()
-        roomsavailable = []
-        for room in rooms:
-            if room not in roomsOccupied:
-                roomsavailable.append(room)
+        date = form.date.data
+        start = form.start_time.data
+        end = start + form.duration.data
+
+        def render():
+            grid = OccupancyGrid.for_date(date)
+            return render_template("_roomavailable.html", rooms=grid.free_rooms(start, end))
+
+        content = fragment_cache.render("roomavailable", date, (start, end), render)
         return render_template(
-            "roomavailablelist.html", title="Room available", rooms=roomsavailable
+            "roomavailablelist.html", title="Room available", content=content
         )
     return render_template(
         "roomavailable.html", title="Room availability check", form=form
     )
 
 
+@bp.route("/roomsearch", methods=["GET", "POST"])
+@read_only
+def roomsearch():
+    form = RoomSearchForm()
+    if form.validate_on_submit():
+        slots = search_free_slots(
+            form.start_date.data,
+            form.end_date.data,
+            form.duration.data,
+            capacity=form.capacity.data or 0,
+            projector=form.projector.data,
+            whiteboard=form.whiteboard.data,
+            telephone=form.telephone.data,
+        )
+        return render_template(
+            "roomsearchlist.html",
+            title="Free rooms",
+            startdate=form.start_date.data,
+            enddate=form.end_date.data,
+            duration=form.duration.data,
+            slots=slots,
+        )
+    return render_template("roomsearch.html", title="Free room search", form=form)
+
+
 @bp.route("/roomoccupation", methods=["GET", "POST"])
+@read_only
 def roomoccupation():
     form = RoomOccupationForm()
     if form.validate_on_submit():
-        # meetings=Meeting.query.filter_by(date=datetime.combine(form.date.data,datetime.min.time())).all()
-        roomoccus = []
-        hours = range(9, 23)
-        rooms = Room.query.all()
-        allrooms = []
-        for room in rooms:
-            roomoccu = dict()
-            roomoccu["roomName"] = room.roomName
-            roomoccu["roomhours"] = [False] * 14
-            for hour in hours:
-                bookings = (
-                    Booking.query.filter_by(
-                        date=datetime.combine(form.date.data, datetime.min.time())
-                    )
-                    .filter_by(roomId=room.id)
-                    .all()
+        date = form.date.data
+
+        def render():
+            grid = OccupancyGrid.for_date(date)
+            roomoccus = []
+            allrooms = []
+            for room in grid.rooms:
+                roomoccus.append(
+                    {"roomId": room.id, "roomName": room.name, "roomslots": grid.row(room.id)}
                 )
-
-                for booking in bookings:
-                    if (hour + 0.5) < booking.endTime and (
-                        hour + 0.5
-                    ) > booking.startTime:
-                        roomoccu["roomhours"][hour - 9] = True
-                        break
-            roomoccus.append(roomoccu)
-
-            allrooms.append(
-                {
-                    "roomName": room.roomName,
-                    "tel": "Yes" if room.telephone else "No",
-                    "pro": "Yes" if room.projector else "No",
-                    "wb": "Yes" if room.whiteboard else "No",
-                    "cost": room.cost,
-                }
+                allrooms.append(
+                    {
+                        "roomName": room.name,
+                        "tel": "Yes" if room.telephone else "No",
+                        "pro": "Yes" if room.projector else "No",
+                        "wb": "Yes" if room.whiteboard else "No",
+                        "cost": room.cost,
+                    }
+                )
+            return render_template(
+                "_roomoccupation.html",
+                roomoccus=roomoccus,
+                date=date,
+                hours=[str(hour) for hour in grid.hours],
+                slots_per_hour=SLOTS_PER_HOUR,
+                allrooms=allrooms,
             )
+
+        # Taken before rendering, so the live updates replay anything
+        # committed while the page was being built
+        cursor = latest_seq()
+        content = fragment_cache.render("roomoccupation", date, (), render)
         return render_template(
             "roomoccupationlist.html",
             title="Room Occupation",
-            roomoccus=roomoccus,
-            date=form.date.data,
-            hours=[str(hour) for hour in hours],
-            allrooms=allrooms,
+            content=content,
+            date=date,
+            cursor=cursor,
         )
     return render_template(
         "roomoccupation.html", title="Room Occupation Status", form=form
     )
 
 
+@bp.route("/occupancyevents")
+@read_only
+def occupancyevents():
+    # Server-sent occupancy updates for one day, resumable from the
+    # sequence number in Last-Event-ID (or ?since= on the first connect)
+    try:
+        day = datetime.fromisoformat(request.args.get("date", "")).date()
+    except ValueError:
+        abort(400)
+    since = request.headers.get("Last-Event-ID") or request.args.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            abort(400)
+
+    subscription = broker.subscribe(day)
+    replay = occupancy_events(since, day) if since is not None else []
+    heartbeat = app.config.get("EVENTS_HEARTBEAT", 15)
+
+    def stream():
+        last = since or 0
+        try:
+            yield "retry: 3000\n\n"
+            for event in replay:
+                last = event["seq"]
+                yield format_event(event)
+            while not subscription.dropped:
+                try:
+                    event = subscription.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event["seq"] > last:
+                    last = event["seq"]
+                    yield format_event(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+MEETINGS_PER_PAGE = 50
+
+
+def _booking_cursor(date, booking_id):
+    return f"{date.isoformat()}_{booking_id}"
+
+
+def _parse_booking_cursor(cursor):
+    try:
+        date, booking_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(date), int(booking_id)
+    except ValueError:
+        return None
+
+
 @bp.route("/meetingbooker")
+@read_only
 def meetingbooker():
-    bookings = Booking.query.order_by(Booking.date).all()
-    bookingreturns = []
-    for booking in bookings:
-        bookingreturn = dict()
-        bookingreturn["title"] = booking.title
-        bookingreturn["team"] = Team.query.filter_by(id=booking.teamId).first().teamName
-        bookingreturn["room"] = Room.query.filter_by(id=booking.roomId).first().roomName
-        bookingreturn["booker"] = (
-            User.query.filter_by(id=booking.bookerId).first().fullname
+    form = MeetingFilterForm(request.args)
+    valid = form.validate()
+    # keyset pagination on (date, id), so deep pages cost the same as the first
+    cursor = _parse_booking_cursor(request.args.get("after", ""))
+
+    # The archive is only read when the page can reach back into it
+    first_day = form.start_date.data if valid else None
+    if cursor is not None and (first_day is None or cursor[0].date() > first_day):
+        first_day = cursor[0].date()
+    bookings = with_archive(Booking.__table__, first_day)
+    query = (
+        db.session.query(
+            bookings.c.id,
+            bookings.c.title,
+            bookings.c.date,
+            bookings.c.start_time,
+            bookings.c.end_time,
+            Team.name.label("team"),
+            Room.name.label("room"),
+            User.fullname,
         )
-        bookingreturn["date"] = booking.date.date()
-        bookingreturn["time"] = f"{booking.startTime} to {booking.endTime}"
-        bookingreturns.append(bookingreturn)
-    return render_template("meetingbooker.html", meetings=bookingreturns)
+        # outer joins: past bookings keep the ids of deleted users and teams
+        .outerjoin(Team, bookings.c.team_id == Team.id)
+        .outerjoin(Room, bookings.c.room_id == Room.id)
+        .outerjoin(User, bookings.c.user_id == User.id)
+    )
+    filters = {}
+    if valid:
+        if form.team.data:
+            query = query.filter(bookings.c.team_id == form.team.data)
+            filters["team"] = form.team.data
+        if form.room.data:
+            query = query.filter(bookings.c.room_id == form.room.data)
+            filters["room"] = form.room.data
+        if form.start_date.data:
+            query = query.filter(
+                bookings.c.date >= datetime.combine(form.start_date.data, datetime.min.time())
+            )
+            filters["start_date"] = form.start_date.data.strftime("%m/%d/%Y")
+        if form.end_date.data:
+            query = query.filter(
+                bookings.c.date <= datetime.combine(form.end_date.data, datetime.min.time())
+            )
+            filters["end_date"] = form.end_date.data.strftime("%m/%d/%Y")
+
+    if cursor is not None:
+        date, booking_id = cursor
+        query = query.filter(
+            or_(bookings.c.date > date, and_(bookings.c.date == date, bookings.c.id > booking_id))
+        )
+    rows = query.order_by(bookings.c.date, bookings.c.id).limit(MEETINGS_PER_PAGE + 1).all()
+
+    next_url = None
+    if len(rows) > MEETINGS_PER_PAGE:
+        rows = rows[:MEETINGS_PER_PAGE]
+        last = rows[-1]
+        next_url = url_for(
+            "main.meetingbooker", after=_booking_cursor(last.date, last.id), **filters
+        )
+    first_url = url_for("main.meetingbooker", **filters) if cursor is not None else None
+
+    bookingreturns = [
+        {
+            "title": row.title,
+            "team": row.team or "",
+            "room": row.room or "",
+            "booker": row.fullname or "",
+            "date": row.date.date(),
+            "time": f"{format_time(row.start_time)} to {format_time(row.end_time)}",
+        }
+        for row in rows
+    ]
+    return render_template(
+        "meetingbooker.html",
+        meetings=bookingreturns,
+        form=form,
+        next_url=next_url,
+        first_url=first_url,
+    )
 
 
 @bp.route("/meetingparticipants", methods=["GET", "POST"])
+@read_only
 def meetingparticipants():
     form = MeetingParticipantsForm()
     if form.validate_on_submit():
-        booking = Booking.query.filter_by(id=form.ids.data).first()
-        participants = []
-        participants_user = ParticipantsUser.query.filter_by(
-            meeting=booking.title
-        ).all()
-        participants_partner = ParticipantsPartner.query.filter_by(
-            meeting=booking.title
-        ).all()
-        for part in participants_user:
-            participants.append(
-                f"{User.query.filter_by(id=part.userId).first().fullname} from {Team.query.filter_by(id=User.query.filter_by(id=part.userId).first().teamId).first().teamName}"
-            )
-        for part in participants_partner:
-            participants.append(
-                f"partner {BusinessPartner.query.filter_by(id=part.partnerId).first().name} from {BusinessPartner.query.filter_by(id=part.partnerId).first().representing}"
-            )
+        booking = Booking.query.get(form.ids.data)
         return render_template(
             "meetingparticipants.html",
             title="Meeting Participants",
             meetingtitle=booking.title,
-            participants=participants,
+            participants=participants_of(booking),
         )
     return render_template(
         "meetingparticipantscheck.html", title="Booking Participants", form=form
@@ -453,35 +675,85 @@ def meetingparticipants():
 
 
 @bp.route("/costs", methods=["GET", "POST"])
+@read_only
 def costs():
     form = CostAccruedForm()
     if form.validate_on_submit():
-        costlogs = (
-            CostLog.query.filter(
-                CostLog.date
-                >= datetime.combine(form.startdate.data, datetime.min.time())
-            )
-            .filter(
-                CostLog.date <= datetime.combine(form.enddate.data, datetime.min.time())
-            )
-            .all()
+        teamcosts = team_costs(
+            datetime.combine(form.start_date.data, datetime.min.time()),
+            datetime.combine(form.end_date.data, datetime.min.time()),
         )
-        teams = list(set([costlog.teamName for costlog in costlogs]))
-        teamcosts = []
-        # slow implementation, can be optimized
-        for team in teams:
-            teamcost = dict()
-            teamcost["teamName"] = team
-            teamcost["total"] = 0
-            for costlog in costlogs:
-                if costlog.teamName == team:
-                    teamcost["total"] += costlog.cost
-            teamcosts.append(teamcost)
         return render_template(
             "costs.html",
             title="Cost Accrued",
-            startdate=form.startdate.data,
-            enddate=form.enddate.data,
+            startdate=form.start_date.data,
+            enddate=form.end_date.data,
             teamcosts=teamcosts,
         )
     return render_template("costcheck.html", title="Cost Accrued check", form=form)
+
+
+@bp.route("/export")
+@login_required
+@read_only
+def export():
+    form = ExportForm(request.args)
+    if "kind" in request.args and form.validate():
+        from app.export import MIMETYPES, export_chunks
+
+        kind, fmt = form.kind.data, form.format.data
+        chunks = export_chunks(kind, fmt, form.start_date.data, form.end_date.data, form.team.data)
+        # The rows are read while the response is sent, inside this request
+        return Response(
+            stream_with_context(chunks),
+            mimetype=MIMETYPES[fmt],
+            headers={"Content-Disposition": f"attachment; filename={kind}.{fmt}"},
+        )
+    return render_template("export.html", title="Export", form=form)
+
+
+CHANGES_PER_PAGE = 500
+
+
+@bp.route("/changes")
+@read_only
+def changes():
+    # Delta sync for polling clients: without `since` only the current
+    # cursor is returned, to be taken before loading /meetingbooker.
+    if "since" not in request.args:
+        return jsonify(cursor=latest_seq(), changes=[], more=False)
+    since = request.args.get("since", type=int)
+    if since is None or since < 0:
+        abort(400)
+    rows = changes_since(since, CHANGES_PER_PAGE + 1)
+    more = len(rows) > CHANGES_PER_PAGE
+    rows = rows[:CHANGES_PER_PAGE]
+    cursor = rows[-1]["seq"] if rows else since
+    return jsonify(cursor=cursor, changes=rows, more=more)
+
+
+@bp.route("/cachestats")
+@login_required
+def cachestats():
+    if current_user.username != "admin":
+        abort(403)
+    return jsonify(users=user_cache.stats(), fragments=fragment_cache.stats())
+
+
+@bp.route("/metrics")
+def metrics():
+    token = app.config.get("METRICS_TOKEN")
+    authorised = token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not authorised and (not current_user.is_authenticated or current_user.username != "admin"):
+        abort(403)
+    stats = user_cache.stats()
+    body = instrumentation.prometheus(
+        extra=[
+            ("roombooking_user_cache_hits_total", "counter", "Flask-Login user cache hits.", stats["hits"]),
+            ("roombooking_user_cache_misses_total", "counter", "Flask-Login user cache misses.", stats["misses"]),
+            ("roombooking_user_cache_size", "gauge", "Users held in the cache.", stats["size"]),
+            ("roombooking_fragment_cache_hits_total", "counter", "Rendered fragment cache hits.", fragment_cache.hits),
+            ("roombooking_fragment_cache_misses_total", "counter", "Rendered fragment cache misses.", fragment_cache.misses),
+        ]
+    )
+    return Response(body, mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,56 @@
+import functools
+
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+READER = "reader"
+
+
+def reader_url(url):
+    """Read-only (mode=ro) URL of a file SQLite database, or None."""
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return None
+    return url.set(database=f"file:{url.database}", query={**url.query, "mode": "ro", "uri": "true"})
+
+
+def configure(app):
+    # Called before db.init_app, which creates an engine per bind
+    if not app.config.get("DB_READ_SPLIT"):
+        return
+    url = reader_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url is None:
+        return
+    binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+    binds[READER] = {
+        "url": url.render_as_string(hide_password=False),
+        "pool_size": app.config.get("DB_READ_POOL_SIZE", 10),
+    }
+    app.config["SQLALCHEMY_BINDS"] = binds
+
+
+class RoutingSession(Session):
+    """Sends the statements of read-only views to the reader engine.
+
+    ORM flushes always use the primary; a Core write issued from a
+    read-only view fails on the mode=ro connection.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("read_only"):
+            reader = self._db.engines.get(READER)
+            if reader is not None:
+                return reader
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(view):
+    """Serve the view from the read-only connection pool."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_only = True
+        return view(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,69 @@
+import sqlalchemy as sa
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Booking, SlotClaim, User
+from app.occupancy import format_time, slot_range
+
+# Named as the booker of a booking whose user has been deleted
+DELETED_USER = "a deleted user"
+
+
+class SlotTaken(Exception):
+    """Another booking already holds part of the requested time."""
+
+    def __init__(self, start, end, booker):
+        super().__init__(
+            f"The time from {format_time(start)} to {format_time(end)} is already booked by {booker}."
+        )
+        self.start = start
+        self.end = end
+        self.booker = booker
+
+
+def claim_rows(booking_id, room_id, date, start, end):
+    return [
+        {"room_id": room_id, "date": date, "slot": slot, "booking_id": booking_id}
+        for slot in slot_range(start, end)
+    ]
+
+
+def claim_slots(booking):
+    """Claim the slots of a flushed booking in the current transaction.
+
+    The insert is the conflict check. On a clash the transaction is rolled
+    back and SlotTaken names the booking that holds the time.
+    """
+    start, end = booking.start_time, booking.end_time
+    rows = claim_rows(booking.id, booking.room_id, booking.date, start, end)
+    try:
+        db.session.execute(sa.insert(SlotClaim), rows)
+    except IntegrityError as error:
+        if "slot_claim" not in str(error.orig):
+            raise
+        db.session.rollback()
+        holder = db.session.execute(
+            sa.select(Booking.start_time, Booking.end_time, sa.func.coalesce(User.fullname, DELETED_USER))
+            .join(SlotClaim, SlotClaim.booking_id == Booking.id)
+            .outerjoin(User, Booking.user_id == User.id)
+            .where(
+                SlotClaim.room_id == rows[0]["room_id"],
+                SlotClaim.date == rows[0]["date"],
+                SlotClaim.slot.in_([row["slot"] for row in rows]),
+            )
+            .limit(1)
+        ).first()
+        if holder is None:
+            # the holder was cancelled in the meantime
+            raise SlotTaken(start, end, "another booking") from error
+        raise SlotTaken(*holder) from error
+
+
+def holds_slots(booking_id):
+    return db.session.query(
+        sa.exists().where(SlotClaim.booking_id == booking_id)
+    ).scalar()
+
+
+def release_slots(booking_id):
+    db.session.execute(sa.delete(SlotClaim).where(SlotClaim.booking_id == booking_id))
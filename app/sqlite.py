@@ -0,0 +1,81 @@
+import functools
+import random
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.routing import READER
+
+
+def _set_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return on_connect
+
+
+# Queue pool settings, which the single shared connection of an in-memory
+# database (StaticPool) does not accept
+POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+
+
+def configure(app):
+    # Called before db.init_app, once the database URI is final
+    url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+        return
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    for name in POOL_OPTIONS:
+        options.pop(name, None)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def init_app(app):
+    pragmas = app.config.get("SQLITE_PRAGMAS") or {}
+    with app.app_context():
+        engines = dict(db.engines)
+    for key, engine in engines.items():
+        if engine.dialect.name != "sqlite":
+            continue
+        if key == READER:
+            # The journal mode is the primary's to set; readers are
+            # additionally kept from writing
+            reader_pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+            event.listen(engine, "connect", _set_pragmas({**reader_pragmas, "query_only": 1}))
+        elif pragmas:
+            event.listen(engine, "connect", _set_pragmas(pragmas))
+
+
+def is_busy(error):
+    message = str(error.orig).lower()
+    return "database is locked" in message or "database is busy" in message
+
+
+def retry_on_busy(view):
+    """Re-run a writing view when SQLite reports the database as busy.
+
+    The session is rolled back before each retry, with a short randomised
+    backoff so competing writers do not retry in lockstep.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        from flask import current_app
+
+        retries = current_app.config.get("SQLITE_BUSY_RETRIES", 0)
+        for attempt in range(retries + 1):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                if attempt == retries or not is_busy(e):
+                    raise
+                time.sleep(0.01 * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    return wrapper
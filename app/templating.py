@@ -0,0 +1,21 @@
+import os
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_app(app):
+    # Compiled templates kept on disk, so a new worker loads them instead
+    # of parsing and compiling each template on its first use
+    cache_dir = app.config.get("TEMPLATE_CACHE_DIR")
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+
+
+def compile_templates(app):
+    """Load every template once, writing each to the bytecode cache."""
+    env = app.jinja_env
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+import sqlalchemy as sa
+from flask_login import UserMixin
+
+
+class CachedUser(UserMixin):
+    """Lightweight stand-in for User handed to Flask-Login."""
+
+    def __init__(self, id, username, fullname, team_id):
+        self.id = id
+        self.username = username
+        self.fullname = fullname
+        self.team_id = team_id
+
+    @property
+    def team(self):
+        from app.models import Team
+
+        return Team.query.get(self.team_id)
+
+    def __repr__(self):
+        return f'<CachedUser {self.username}>'
+
+
+class UserCache:
+    """LRU cache of CachedUser records with a time-to-live per entry.
+
+    Entries carry the "user" table version they were loaded at; writes in
+    any worker process bump it, so deleted or moved users are reloaded on
+    their next request rather than when the entry expires. Checking costs
+    the request's one read of the version table, which the cached form
+    choices share, instead of a read of the user row.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("USER_CACHE_SIZE", self.maxsize)
+        self.ttl = app.config.get("USER_CACHE_TTL", self.ttl)
+
+    def get(self, user_id):
+        from app.choice_cache import table_versions
+
+        now = time.monotonic()
+        version = table_versions().get("user", 0)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        user = self._load(user_id)
+        if user is not None:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, version, user)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return user
+
+    def _load(self, user_id):
+        from app import db
+        from app.models import User
+
+        row = db.session.execute(
+            sa.select(User.id, User.username, User.fullname, User.team_id).where(
+                User.id == user_id
+            )
+        ).first()
+        return CachedUser(*row) if row is not None else None
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = UserCache()
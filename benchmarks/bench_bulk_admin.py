@@ -0,0 +1,139 @@
+"""Bulk admin operations against the one-user-at-a-time forms.
+
+    python benchmarks/bench_bulk_admin.py [users]
+
+The database holds a sample of bookings; every operation works on a fresh
+team of users without bookings, since the per-row ORM path cannot delete
+users or teams that still have past bookings. The last line compares the
+future-booking guard of the old views, which loaded all of a team's
+bookings, with the EXISTS probe.
+"""
+import sys
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from common import count_queries, make_app, seed_sample
+
+
+def new_team(db, name, members):
+    from app.models import Team, User
+
+    team_id = db.session.execute(sa.insert(Team).values(name=name)).inserted_primary_key[0]
+    db.session.execute(
+        sa.insert(User),
+        [
+            {
+                "username": f"{name}-{i}",
+                "fullname": f"User {i}",
+                "position": "Engineer",
+                "team_id": team_id,
+                "password_hash": "x",
+            }
+            for i in range(members)
+        ],
+    )
+    db.session.commit()
+    user_ids = db.session.scalars(sa.select(User.id).where(User.team_id == team_id)).all()
+    return team_id, user_ids
+
+
+# The per-row paths below repeat what the views did before the bulk
+# operations, once per submitted form
+
+
+def per_row_delete(db, user_ids):
+    from app.choice_cache import bump
+    from app.models import Booking, User
+
+    for user_id in user_ids:
+        user = User.query.filter_by(id=user_id).first()
+        bookings = Booking.query.filter_by(user_id=user.id).all()
+        if any(booking.date > datetime.now() for booking in bookings):
+            continue
+        db.session.delete(user)
+        bump("user")
+        db.session.commit()
+
+
+def per_row_move(db, user_ids, team_id):
+    from app.choice_cache import bump
+    from app.models import User
+
+    for user_id in user_ids:
+        user = User.query.filter_by(id=user_id).first()
+        user.team_id = team_id
+        bump("user")
+        db.session.commit()
+
+
+def per_row_merge(db, source_id, into_id):
+    from app.choice_cache import bump
+    from app.models import Booking, Team, User
+
+    per_row_move(db, [user.id for user in User.query.filter_by(team_id=source_id).all()], into_id)
+    team = Team.query.filter_by(id=source_id).first()
+    bookings = Booking.query.filter_by(team_id=team.id).all()
+    if not any(booking.date > datetime.now() for booking in bookings):
+        db.session.delete(team)
+        bump("team")
+        db.session.commit()
+
+
+def timed(db, operation):
+    started = time.perf_counter()
+    with count_queries(*db.engines.values()) as queries:
+        operation()
+    return time.perf_counter() - started, queries.count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = make_app(SQL_SLOW_QUERY_MS=60000)
+    from app import db
+    from app.bulk_admin import _future_booking, delete_users, merge_teams, move_users
+    from app.models import Booking
+
+    with app.test_request_context():
+        seed_sample(db, rooms=20, days=180)
+        target_id, _ = new_team(db, "target", 1)
+
+        runs = []
+        for name, per_row, bulk in (
+            ("delete users", lambda ids, team: per_row_delete(db, ids), lambda ids, team: delete_users(ids)),
+            ("move users", lambda ids, team: per_row_move(db, ids, target_id), lambda ids, team: move_users(ids, target_id)),
+            ("merge team", lambda ids, team: per_row_merge(db, team, target_id), lambda ids, team: merge_teams([team], target_id)),
+        ):
+            team_id, user_ids = new_team(db, f"{name} row", count)
+            row_time, row_queries = timed(db, lambda: per_row(user_ids, team_id))
+            team_id, user_ids = new_team(db, f"{name} bulk", count)
+            bulk_time, bulk_queries = timed(db, lambda: bulk(user_ids, team_id))
+            runs.append((name, row_time, row_queries, bulk_time, bulk_queries))
+
+        busy_team = db.session.scalar(
+            sa.select(Booking.team_id).group_by(Booking.team_id).order_by(sa.func.count().desc()).limit(1)
+        )
+        row_time, row_queries = timed(
+            db,
+            lambda: any(
+                booking.date > datetime.now() for booking in Booking.query.filter_by(team_id=busy_team).all()
+            ),
+        )
+        bulk_time, bulk_queries = timed(
+            db, lambda: db.session.scalar(sa.select(_future_booking(Booking.team_id, busy_team)))
+        )
+        bookings = db.session.scalar(sa.select(sa.func.count()).where(Booking.team_id == busy_team))
+        runs.append((f"guard, {bookings} bk", row_time, row_queries, bulk_time, bulk_queries))
+
+    print(f"{count} users per operation")
+    print(f"{'operation':18} {'per-row':>10} {'stmts':>7} {'bulk':>10} {'stmts':>7} {'speedup':>8}")
+    for name, row_time, row_queries, bulk_time, bulk_queries in runs:
+        print(
+            f"{name:18} {row_time * 1000:8.1f}ms {row_queries:7} "
+            f"{bulk_time * 1000:8.1f}ms {bulk_queries:7} {row_time / bulk_time:7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
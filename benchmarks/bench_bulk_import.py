@@ -0,0 +1,65 @@
+"""Throughput of the bulk user import against one-at-a-time inserts.
+
+    python benchmarks/bench_bulk_import.py [users]
+"""
+import os
+import sys
+import time
+
+from common import make_app
+
+
+def records(count, prefix):
+    return [
+        {
+            "username": f"{prefix}{i}",
+            "password": f"secret-{i}",
+            "fullname": f"User {i}",
+            "position": "Engineer",
+            "team_name": f"Department {i % 20}",
+        }
+        for i in range(count)
+    ]
+
+
+def per_row(db, rows):
+    from app.models import Team, User
+
+    started = time.perf_counter()
+    for row in rows:
+        team = Team.query.filter_by(name=row["team_name"]).first()
+        if team is None:
+            team = Team(name=row["team_name"])
+            db.session.add(team)
+            db.session.flush()
+        user = User(
+            username=row["username"],
+            fullname=row["fullname"],
+            position=row["position"],
+            team_id=team.id,
+        )
+        user.set_password(row["password"])
+        db.session.add(user)
+        db.session.commit()
+    return len(rows) / (time.perf_counter() - started)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = make_app()
+    from app import db
+    from app.bulk_import import import_users
+
+    with app.test_request_context():
+        serial = import_users(records(count, "serial"), workers=1)
+        parallel = import_users(records(count, "parallel"))
+        baseline = per_row(db, records(min(count, 200), "row"))
+
+    print(f"users: {count}, cores: {os.cpu_count()}")
+    print(f"per-row adduser path   {baseline:8.0f} users/s")
+    print(f"bulk, 1 hashing proc   {serial['rate']:8.0f} users/s")
+    print(f"bulk, process pool     {parallel['rate']:8.0f} users/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Peak memory of the streaming exports as the number of rows grows.
+
+    python benchmarks/bench_export.py
+
+Each size is seeded with populate.py; the CSV and JSON exports of all
+bookings and cost logs are read chunk by chunk through the test client.
+"""
+import time
+import tracemalloc
+
+from common import logged_in_client, make_app
+
+DAYS = (30, 120, 365)
+ROOMS = 50
+BOOKINGS_PER_ROOM_DAY = 6
+
+
+def main():
+    import populate
+
+    print(f"{'rows':>8} {'export':14} {'MiB out':>8} {'seconds':>8} {'peak KiB':>9}")
+    for days in DAYS:
+        app = make_app(SQL_SLOW_QUERY_MS=60000)
+        argv = [f"--rooms={ROOMS}", f"--days={days}", f"--bookings-per-room-day={BOOKINGS_PER_ROOM_DAY}", "--users=200"]
+        with app.app_context():
+            rows = populate.populate(populate.parse_args(argv))["bookings"]
+
+        client = logged_in_client(app, 1)
+        for kind in ("bookings", "costs"):
+            for fmt in ("csv", "json"):
+                tracemalloc.start()
+                started = time.perf_counter()
+                response = client.get(f"/export?kind={kind}&format={fmt}", buffered=False)
+                size = sum(len(chunk) for chunk in response.response)
+                response.close()
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{rows:8} {kind + ' ' + fmt:14} {size / 2**20:8.1f} {elapsed:8.2f} {peak / 1024:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Booking latency under heavy report traffic, with and without the read pool.
+
+    python benchmarks/bench_read_split.py [readers] [writers] [seconds]
+
+Report threads loop over /costs, /meetingbooker and /roomoccupation while
+writer threads book a stream of meetings. Each run uses a fresh database.
+"""
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from common import logged_in_client, make_app, seed_sample
+
+ROOMS = 20
+DAYS = 180
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(split, readers, writers, seconds):
+    app = make_app(DB_READ_SPLIT=split, SQL_SLOW_QUERY_MS=60000)
+    from app import db
+    from app.booking_index import booking_index
+
+    with app.app_context():
+        first_day = seed_sample(db, rooms=ROOMS, days=DAYS)
+        booking_index.rebuild()
+
+    fmt = lambda day: day.strftime("%m/%d/%Y")
+    reports = [
+        ("post", "/costs", {"start_date": fmt(first_day), "end_date": fmt(first_day + timedelta(days=DAYS))}),
+        ("get", "/meetingbooker", None),
+        ("post", "/roomoccupation", {"date": fmt(date.today() + timedelta(days=3))}),
+    ]
+    stop = threading.Event()
+    results = {"report": 0, "book": [], "errors": 0}
+    lock = threading.Lock()
+
+    def reader(number):
+        client = logged_in_client(app, 2 + number)
+        sequence = number
+        while not stop.is_set():
+            method, url, data = reports[sequence % len(reports)]
+            sequence += 1
+            response = getattr(client, method)(url, data=data)
+            with lock:
+                if response.status_code == 200:
+                    results["report"] += 1
+                else:
+                    results["errors"] += 1
+
+    def writer(number):
+        client = logged_in_client(app, 2 + number)
+        sequence = 0
+        while not stop.is_set():
+            # distinct room and day per booking so every write is accepted
+            slot = sequence * writers + number
+            sequence += 1
+            data = {
+                "title": f"bench {number}-{sequence}",
+                "room_id": 1 + slot % ROOMS,
+                "date": fmt(date.today() + timedelta(days=DAYS + slot // ROOMS)),
+                "start_time": 9 * 60,
+                "duration": 60,
+                "participants_user": [2],
+            }
+            started = time.perf_counter()
+            response = client.post("/book", data=data)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 302:
+                    results["book"].append(elapsed)
+                else:
+                    results["errors"] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+
+    print(f"{readers} report threads, {writers} booking threads, {seconds:.0f}s per run")
+    print(f"{'read pool':10} {'reports/s':>9} {'bookings/s':>10} {'book p50':>9} {'book p99':>9} {'errors':>7}")
+    for name, split in (("off", False), ("on", True)):
+        results = run(split, readers, writers, seconds)
+        print(
+            f"{name:10} {results['report'] / seconds:9.1f} {len(results['book']) / seconds:10.1f} "
+            f"{percentile(results['book'], 0.5) * 1000:7.1f}ms "
+            f"{percentile(results['book'], 0.99) * 1000:7.1f}ms "
+            f"{results['errors']:7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Query count and wall time of /roomoccupation as the number of rooms grows.
+
+    python benchmarks/bench_roomoccupation.py
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from common import count_queries, make_app
+
+ROOM_COUNTS = (10, 50, 200, 500)
+DAY = date.today() + timedelta(days=1)
+
+
+def seed(db, rooms):
+    from app.models import Booking, Room, Team, User
+
+    team = Team(name="Bench")
+    db.session.add(team)
+    db.session.flush()
+    user = User(username="bench", fullname="Bench", position="-", team_id=team.id, password_hash="-")
+    db.session.add(user)
+    db.session.add_all(Room(name=f"Room {i}", capacity=10, cost=10) for i in range(rooms))
+    db.session.flush()
+
+    rng = random.Random(rooms)
+    day = datetime.combine(DAY, datetime.min.time())
+    for room_id in range(1, rooms + 1):
+        start = 9 * 60
+        while start < 22 * 60:
+            start += rng.randint(0, 12) * 15
+            end = min(start + rng.randint(1, 12) * 15, 23 * 60)
+            if start >= end:
+                break
+            db.session.add(
+                Booking(
+                    title=f"r{room_id}-{start}",
+                    team_id=team.id,
+                    room_id=room_id,
+                    user_id=user.id,
+                    date=day,
+                    start_time=start,
+                    end_time=end,
+                    duration=end - start,
+                )
+            )
+            start = end
+    db.session.commit()
+
+
+def main():
+    print(f"{'rooms':>6} {'queries':>8} {'ms':>8}")
+    for rooms in ROOM_COUNTS:
+        app = make_app()
+        from app import db
+
+        with app.app_context():
+            seed(db, rooms)
+            client = app.test_client()
+            with count_queries(*db.engines.values()) as queries:
+                started = time.perf_counter()
+                response = client.post("/roomoccupation", data={"date": DAY.strftime("%m/%d/%Y")})
+                elapsed = (time.perf_counter() - started) * 1000
+            assert response.status_code == 200, response.status_code
+        print(f"{rooms:>6} {queries.count:>8} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Wall time, SQL statement count and peak memory of every main route.
+
+Seeds databases of several sizes with populate.py and drives each route
+through the test client. Results are written as JSON; given a baseline
+file the run fails when a route got slower than the threshold allows or
+issues more statements than before.
+
+    python benchmarks/bench_routes.py --output results.json
+    python benchmarks/bench_routes.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from itertools import count
+
+from common import count_queries, logged_in_client, make_app
+
+SIZES = {
+    "small": dict(teams=5, users=50, rooms=10, partners=10, days=30, bookings_per_room_day=3),
+    "medium": dict(teams=20, users=500, rooms=50, partners=50, days=180, bookings_per_room_day=4),
+    "large": dict(teams=50, users=2000, rooms=200, partners=100, days=365, bookings_per_room_day=6),
+}
+
+
+def fmt(day):
+    return day.strftime("%m/%d/%Y")
+
+
+def routes(size):
+    today = date.today()
+    days = SIZES[size]["days"]
+    rooms = SIZES[size]["rooms"]
+    titles = count()
+
+    def book():
+        # a fresh slot after the seeded range each time
+        n = next(titles)
+        return {
+            "title": f"bench {n}",
+            "room_id": 1 + n % rooms,
+            "date": fmt(today + timedelta(days=days + 1 + n // rooms)),
+            "start_time": 9 * 60,
+            "duration": 60,
+            "participants_user": [2, 3],
+        }
+
+    return {
+        "GET /book": ("GET", "/book", lambda: None, 2),
+        "POST /book": ("POST", "/book", book, 2),
+        "POST /roomavailable": ("POST", "/roomavailable", lambda: {"date": fmt(today + timedelta(days=2)), "start_time": 10 * 60, "duration": 120}, None),
+        "POST /roomoccupation": ("POST", "/roomoccupation", lambda: {"date": fmt(today + timedelta(days=2))}, None),
+        "POST /roomsearch": ("POST", "/roomsearch", lambda: {"start_date": fmt(today), "end_date": fmt(today + timedelta(days=14)), "duration": 180, "capacity": 8}, None),
+        "GET /meetingbooker": ("GET", "/meetingbooker", lambda: None, None),
+        "GET /meetingparticipants": ("GET", "/meetingparticipants", lambda: None, None),
+        "POST /meetingparticipants": ("POST", "/meetingparticipants", lambda: {"ids": 1}, None),
+        "POST /costs": ("POST", "/costs", lambda: {"start_date": fmt(today), "end_date": fmt(today + timedelta(days=days))}, None),
+    }
+
+
+def measure(app, engines, method, url, data, user_id, repeat):
+    client = logged_in_client(app, user_id) if user_id else app.test_client()
+    # warm up caches and the connection pool
+    client.open(url, method=method, data=data())
+    timings = []
+    statements = 0
+    for _ in range(repeat):
+        payload = data()
+        # keep collector pauses out of the timings
+        gc.collect()
+        gc.disable()
+        try:
+            with count_queries(*engines) as queries:
+                started = time.perf_counter()
+                response = client.open(url, method=method, data=payload)
+                timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+        if response.status_code >= 400:
+            raise RuntimeError(f"{method} {url} returned {response.status_code}")
+        statements = max(statements, queries.count)
+
+    # separate pass, tracemalloc slows everything down
+    tracemalloc.start()
+    client.open(url, method=method, data=data())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "ms": round(statistics.median(timings) * 1000, 2),
+        "statements": statements,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def run(size, repeat):
+    import populate
+
+    app = make_app()
+    from app import db
+    from app.booking_index import booking_index
+
+    params = SIZES[size]
+    argv = [f"--{name.replace('_', '-')}={value}" for name, value in params.items()]
+    with app.app_context():
+        populate.populate(populate.parse_args(argv))
+        booking_index.rebuild()
+        engines = set(db.engines.values())
+
+    results = {}
+    for name, (method, url, data, user_id) in routes(size).items():
+        results[name] = measure(app, engines, method, url, data, user_id, repeat)
+        print(f"{size:7} {name:26} {results[name]['ms']:9.2f}ms {results[name]['statements']:4} stmts {results[name]['peak_kib']:10.1f}KiB")
+    return results
+
+
+def regressions(results, baseline, threshold, slack_ms):
+    found = []
+    for size, routes_ in results.items():
+        for name, result in routes_.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            if result["ms"] > max(before["ms"] * (1 + threshold), before["ms"] + slack_ms):
+                found.append(f"{size} {name}: {before['ms']}ms -> {result['ms']}ms")
+            if result["statements"] > before["statements"]:
+                found.append(f"{size} {name}: {before['statements']} -> {result['statements']} statements")
+            if result["peak_kib"] > before["peak_kib"] * (1 + threshold):
+                found.append(f"{size} {name}: {before['peak_kib']}KiB -> {result['peak_kib']}KiB peak")
+    return found
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small", "medium"])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown, default 25%%")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="slowdowns below this are noise, default 5ms")
+    args = parser.parse_args(argv)
+
+    results = {size: run(size, args.repeat) for size in args.sizes}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.threshold, args.slack_ms)
+        if found:
+            print("\nRegressions:")
+            for line in found:
+                print("  " + line)
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""Concurrent readers and writers with the tuned SQLite profile vs defaults.
+
+    python benchmarks/bench_sqlite_profile.py [readers] [writers] [seconds]
+"""
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from common import logged_in_client, make_app, seed_sample
+
+DEFAULTS = {
+    "SQLITE_PRAGMAS": {},
+    "SQLALCHEMY_ENGINE_OPTIONS": {},
+    "SQLITE_BUSY_RETRIES": 0,
+}
+ROOMS = 20
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(profile, readers, writers, seconds):
+    app = make_app(**profile)
+    from app import db
+    from app.booking_index import booking_index
+
+    with app.app_context():
+        seed_sample(db, rooms=ROOMS, days=60)
+        booking_index.rebuild()
+
+    stop = threading.Event()
+    results = {"read": [], "write": [], "errors": 0}
+    lock = threading.Lock()
+    day = (date.today() + timedelta(days=3)).strftime("%m/%d/%Y")
+
+    def reader():
+        client = app.test_client()
+        while not stop.is_set():
+            started = time.perf_counter()
+            response = client.post("/roomoccupation", data={"date": day})
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 200:
+                    results["read"].append(elapsed)
+                else:
+                    results["errors"] += 1
+
+    def writer(number):
+        client = logged_in_client(app, 2 + number)
+        sequence = 0
+        while not stop.is_set():
+            # distinct room and day per booking so every write is accepted
+            slot = sequence * writers + number
+            sequence += 1
+            data = {
+                "title": f"bench {number}-{sequence}",
+                "room_id": 1 + slot % ROOMS,
+                "date": (date.today() + timedelta(days=40 + slot // ROOMS)).strftime("%m/%d/%Y"),
+                "start_time": 9 * 60,
+                "duration": 60,
+                "participants_user": [2],
+            }
+            started = time.perf_counter()
+            response = client.post("/book", data=data)
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 302:
+                    results["write"].append(elapsed)
+                else:
+                    results["errors"] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    readers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    writers = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    print(f"{readers} readers, {writers} writers, {seconds:.0f}s per profile")
+    print(f"{'profile':10} {'reads/s':>8} {'read p99':>9} {'writes/s':>9} {'write p99':>10} {'errors':>7}")
+    for name, profile in (("defaults", DEFAULTS), ("tuned", {})):
+        results = run(profile, readers, writers, seconds)
+        print(
+            f"{name:10} {len(results['read']) / seconds:8.1f} "
+            f"{percentile(results['read'], 0.99) * 1000:7.1f}ms "
+            f"{len(results['write']) / seconds:9.1f} "
+            f"{percentile(results['write'], 0.99) * 1000:8.1f}ms "
+            f"{results['errors']:7}"
+        )
+
+
+if __name__ == "__main__":
+    main()
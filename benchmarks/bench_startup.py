@@ -0,0 +1,103 @@
+"""Cold start of a worker: import time and time to the first responses.
+
+    python benchmarks/bench_startup.py [runs]
+
+Every run is a fresh interpreter that imports the app package, creates the
+app through lab2.py and requests a few pages as the admin, with the
+template bytecode cache off, empty, and filled by `flask compile-templates`.
+Medians over the runs are printed.
+"""
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_app, seed_sample
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = ("/", "/book", "/roomoccupation", "/meetingbooker", "/costs")
+
+CHILD = f"""
+import json, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+import lab2
+created = time.perf_counter()
+client = lab2.app.test_client()
+with client.session_transaction() as session:
+    session["_user_id"] = "1"
+    session["_fresh"] = True
+pages = []
+for url in {PAGES!r}:
+    begun = time.perf_counter()
+    assert client.get(url).status_code == 200, url
+    pages.append(time.perf_counter() - begun)
+print(json.dumps({{"import": imported - started, "create_app": created - imported, "pages": pages}}))
+"""
+
+
+def run(env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.splitlines()[-1])
+    result["total"] = time.perf_counter() - started
+    return result
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    app = make_app(SQL_SLOW_QUERY_MS=60000)
+    from app import db
+
+    with app.app_context():
+        seed_sample(db, days=30)
+    env = dict(
+        os.environ,
+        DATABASE_URL=app.config["SQLALCHEMY_DATABASE_URI"],
+        SQL_SLOW_QUERY_MS="60000",
+        REGISTER_MIGRATE="0",
+    )
+    env.pop("TEMPLATE_CACHE_DIR", None)
+    cache_dir = tempfile.mkdtemp(prefix="templates-")
+
+    def cold_cache():
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        return dict(env, TEMPLATE_CACHE_DIR=cache_dir)
+
+    def compiled_cache():
+        cached = cold_cache()
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "lab2", "compile-templates"],
+            cwd=ROOT, env=cached, check=True, capture_output=True,
+        )
+        return cached
+
+    modes = (
+        ("no bytecode cache", lambda: env),
+        ("empty cache", cold_cache),
+        ("precompiled", compiled_cache),
+    )
+    print(f"median of {runs} runs; first page is {PAGES[0]}, all pages are {', '.join(PAGES)}")
+    print(f"{'templates':18} {'import':>8} {'create':>8} {'1st page':>9} {'all pages':>10} {'process':>9}")
+    for name, prepare in modes:
+        results = [run(prepare()) for _ in range(runs)]
+        median = lambda values: statistics.median(values) * 1000
+        print(
+            f"{name:18} {median([r['import'] for r in results]):6.0f}ms "
+            f"{median([r['create_app'] for r in results]):6.0f}ms "
+            f"{median([r['pages'][0] for r in results]):7.0f}ms "
+            f"{median([sum(r['pages']) for r in results]):8.0f}ms "
+            f"{median([r['total'] for r in results]):7.0f}ms"
+        )
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
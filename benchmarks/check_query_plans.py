@@ -0,0 +1,107 @@
+"""Fail when a route's queries fall back to a full scan of a large table.
+
+Seeds a scratch database, drives every route through the test client,
+records the SQL it issues and runs EXPLAIN QUERY PLAN on each filtered
+statement.
+
+    python benchmarks/check_query_plans.py
+"""
+import re
+import sys
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from common import logged_in_client, make_app, seed_sample
+
+# Tables that grow with booking history; small lookup tables may be scanned
+HOT_TABLES = {"booking", "cost_log", "participants_user", "participants_partner", "team_daily_cost"}
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+
+
+def scenarios():
+    day = (date.today() + timedelta(days=3)).strftime("%m/%d/%Y")
+    later = (date.today() + timedelta(days=10)).strftime("%m/%d/%Y")
+    return [
+        ("GET", "/book", None, 2),
+        ("POST", "/book", {"title": "plan check", "room_id": 1, "date": later, "start_time": 18 * 60, "duration": 60, "participants_user": [3]}, 2),
+        ("GET", "/cancelbooking", None, 2),
+        # the booking made above; seed_sample(days=60) creates 3600 bookings
+        ("POST", "/cancelbooking", {"ids": 3601}, 2),
+        ("POST", "/roomavailable", {"date": day, "start_time": 10 * 60, "duration": 120}, None),
+        ("POST", "/roomoccupation", {"date": day}, None),
+        ("POST", "/roomsearch", {"start_date": day, "end_date": later, "duration": 120, "capacity": 8, "projector": "y"}, None),
+        ("GET", "/meetingbooker", None, None),
+        ("GET", f"/meetingbooker?team=3&room=2&start_date={day}&end_date={later}", None, None),
+        ("GET", "/meetingbooker?after=2030-01-01T00:00:00_1", None, None),
+        ("GET", "/meetingparticipants", None, None),
+        ("POST", "/meetingparticipants", {"ids": 10}, None),
+        ("POST", "/costs", {"start_date": day, "end_date": later}, None),
+        ("POST", "/deleteteam", {"ids": 2}, 1),
+        ("POST", "/deleteuser", {"ids": 2}, 1),
+        ("POST", "/bulkusers", {"users": [4, 5], "team": 4, "move": "Move"}, 1),
+        ("POST", "/bulkusers", {"users": [4, 5], "delete": "Delete"}, 1),
+        ("POST", "/mergeteams", {"teams": [3], "into": 4}, 1),
+    ]
+
+
+def plan(connection, statement, parameters):
+    rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)
+    return [row[-1] for row in rows]
+
+
+def main():
+    app = make_app()
+    from app import db
+
+    failures = []
+    with app.app_context():
+        seed_sample(db, days=60)
+        engine = db.engine
+        # read-only views run on the reader pool's engine
+        engines = set(db.engines.values())
+    from app.booking_index import booking_index
+
+    booking_index.init_app(app)
+
+    for method, url, data, user_id in scenarios():
+        client = logged_in_client(app, user_id) if user_id else app.test_client()
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        for watched in engines:
+            event.listen(watched, "before_cursor_execute", record)
+        try:
+            response = client.open(url, method=method, data=data)
+        finally:
+            for watched in engines:
+                event.remove(watched, "before_cursor_execute", record)
+        if response.status_code >= 400:
+            failures.append(f"{method} {url}: HTTP {response.status_code}")
+            continue
+
+        with engine.connect() as connection:
+            for statement, parameters in statements:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                if not WHERE.search(statement):
+                    continue
+                for detail in plan(connection, statement, parameters):
+                    match = FULL_SCAN.match(detail)
+                    if match and match.group(1) in HOT_TABLES:
+                        failures.append(f"{method} {url}: {detail}\n    {' '.join(statement.split())}")
+        print(f"{method:4} {url:60} {len(statements):3} statements")
+
+    if failures:
+        print("\nFull table scans:")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+    print("\nNo full scans of hot tables.")
+
+
+if __name__ == "__main__":
+    main()
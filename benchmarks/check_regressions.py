@@ -0,0 +1,126 @@
+"""Fail when a fixed misbehaviour of a route comes back.
+
+Each check drives the app through the test client on a scratch database
+and returns a failure message, or None when the route behaves.
+
+    python benchmarks/check_regressions.py
+"""
+import io
+import sys
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+
+from common import logged_in_client, make_app, seed_sample
+
+
+def warm_user_cache_reads_only_versions(app, db):
+    with app.app_context():
+        engines = list(db.engines.values())
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(" ".join(statement.split()))
+
+    client = logged_in_client(app, 2)
+    client.get("/index")
+    for engine in engines:
+        sa.event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/index")
+    finally:
+        for engine in engines:
+            sa.event.remove(engine, "before_cursor_execute", record)
+    if response.status_code != 200:
+        return f"GET /index: HTTP {response.status_code}"
+    if len(statements) != 1 or "table_version" not in statements[0]:
+        return f"GET /index with a cached user ran {statements}, expected one read of table_version"
+
+
+def deleted_user_is_logged_out(app, db):
+    from app.choice_cache import bump
+    from app.models import User
+
+    client = logged_in_client(app, 10)
+    client.get("/index")
+    # as another worker would: straight to the database, then bump the version
+    with app.app_context():
+        db.session.execute(sa.delete(User).where(User.id == 10))
+        bump("user")
+        db.session.commit()
+    response = client.get("/book")
+    if response.status_code != 302:
+        return f"GET /book as a deleted user: HTTP {response.status_code}, expected a redirect to login"
+
+
+def room_search_rejects_bad_start_date(app, db):
+    client = logged_in_client(app, 2)
+    response = client.post("/roomsearch", data={"start_date": "someday", "end_date": "01/01/2030", "duration": 60})
+    if response.status_code != 200:
+        return f"POST /roomsearch with an unparseable start date: HTTP {response.status_code}, expected the form again"
+
+
+def user_import_rejects_malformed_records(app, db):
+    client = logged_in_client(app, 1)
+    for payload in (b"[1]", b'[{"username": 5}]'):
+        response = client.post("/importusers", data={"users": (io.BytesIO(payload), "users.json")})
+        if response.status_code != 302:
+            return f"POST /importusers with {payload.decode()}: HTTP {response.status_code}, expected a redirect"
+
+
+def cancelled_booking_leaves_no_participants(app, db):
+    from app.models import Booking, ParticipantsPartner, ParticipantsUser
+
+    client = logged_in_client(app, 2)
+    day = (date.today() + timedelta(days=5)).strftime("%m/%d/%Y")
+    client.post(
+        "/book",
+        data={"title": "cascade check", "room_id": 1, "date": day, "start_time": 18 * 60, "duration": 60,
+              "participants_user": [3], "participants_partner": [1]},
+    )
+    with app.app_context():
+        booking_id = db.session.scalar(sa.select(Booking.id).where(Booking.title == "cascade check"))
+    if booking_id is None:
+        return "POST /book did not create the booking to cancel"
+    client.post("/cancelbooking", data={"ids": booking_id})
+    with app.app_context():
+        left = sum(
+            db.session.scalar(sa.select(sa.func.count()).where(model.booking_id == booking_id))
+            for model in (ParticipantsUser, ParticipantsPartner)
+        )
+    if left:
+        return f"POST /cancelbooking left {left} participant rows of booking {booking_id}"
+
+
+CHECKS = [
+    warm_user_cache_reads_only_versions,
+    deleted_user_is_logged_out,
+    room_search_rejects_bad_start_date,
+    user_import_rejects_malformed_records,
+    cancelled_booking_leaves_no_participants,
+]
+
+
+def main():
+    app = make_app()
+    from app import db
+
+    with app.app_context():
+        seed_sample(db, days=2)
+    failures = []
+    for check in CHECKS:
+        failure = check(app, db)
+        print(f"{check.__name__:40} {'FAIL' if failure else 'ok'}")
+        if failure:
+            failures.append(failure)
+
+    if failures:
+        print("\nRegressions:")
+        for failure in failures:
+            print("  " + failure)
+        sys.exit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_app(path=None, **config):
+    from app import create_app, db
+    from config import Config
+
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="bench-", suffix=".db")
+        os.close(fd)
+        os.unlink(path)
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = "sqlite:///" + path
+        WTF_CSRF_ENABLED = False
+
+    for name, value in config.items():
+        setattr(BenchConfig, name, value)
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def logged_in_client(app, user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+    return client
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args):
+        self.count += 1
+
+
+@contextmanager
+def count_queries(*engines):
+    # Pass every engine of db.engines: read-only views run on the reader
+    from sqlalchemy import event
+
+    counter = QueryCounter()
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter)
+
+
+def seed_sample(db, teams=5, users=50, rooms=20, partners=10, days=30, first_day=None):
+    """Fill a fresh database with non-overlapping bookings around today.
+
+    Booking ids are assumed to start at 1, so the database must be empty.
+    Every room gets three meetings a day with two company and one partner
+    participant each. User 1 is the admin.
+    """
+    import random
+    from datetime import date, datetime, timedelta
+
+    import sqlalchemy as sa
+    from werkzeug.security import generate_password_hash
+
+    from app.costs import rebuild_cost_rollup
+    from app.slot_claims import claim_rows
+    from app.models import (
+        Booking,
+        BusinessPartner,
+        CostLog,
+        ParticipantsPartner,
+        ParticipantsUser,
+        Room,
+        SlotClaim,
+        Team,
+        User,
+    )
+
+    rng = random.Random(0)
+    password_hash = generate_password_hash("password")
+    first_day = first_day or date.today() - timedelta(days=days // 2)
+
+    db.session.execute(sa.insert(Team), [{"name": "Admin"}] + [{"name": f"Team {i}"} for i in range(teams)])
+    db.session.execute(
+        sa.insert(User),
+        [{"username": "admin", "fullname": "Admin", "position": "Admin", "team_id": 1, "password_hash": password_hash}]
+        + [
+            {
+                "username": f"user{i}",
+                "fullname": f"User {i}",
+                "position": "Engineer",
+                "team_id": 2 + i % teams,
+                "password_hash": password_hash,
+            }
+            for i in range(users)
+        ],
+    )
+    db.session.execute(
+        sa.insert(Room),
+        [
+            {
+                "name": f"Room {i}",
+                "capacity": 4 + i % 4 * 4,
+                "telephone": "555-0100" if i % 2 else None,
+                "projector": i % 3 == 0,
+                "whiteboard": i % 2 == 0,
+                "cost": 10 + i % 5 * 10,
+            }
+            for i in range(rooms)
+        ],
+    )
+    db.session.execute(
+        sa.insert(BusinessPartner),
+        [{"name": f"Partner {i}", "representing": f"Company {i}", "position": "Sales"} for i in range(partners)],
+    )
+
+    bookings, logs, participants_user, participants_partner, claims = [], [], [], [], []
+    for day in range(days):
+        when = datetime.combine(first_day + timedelta(days=day), datetime.min.time())
+        for room in range(1, rooms + 1):
+            for start in (9 * 60, 12 * 60, 15 * 60):
+                duration = rng.randint(1, 3) * 60
+                user_id = rng.randint(2, users + 1)
+                team_id = 2 + (user_id - 2) % teams
+                title = f"Meeting {day}-{room}-{start}"
+                bookings.append(
+                    {
+                        "title": title,
+                        "team_id": team_id,
+                        "room_id": room,
+                        "user_id": user_id,
+                        "date": when,
+                        "start_time": start,
+                        "end_time": start + duration,
+                        "duration": duration,
+                    }
+                )
+                logs.append(
+                    {
+                        "title": title,
+                        "team_id": team_id,
+                        "team_name": f"Team {team_id - 2}",
+                        "date": when,
+                        "cost": (10 + (room - 1) % 5 * 10) * duration // 60,
+                    }
+                )
+                for participant in rng.sample(range(2, users + 2), 2):
+                    participants_user.append({"booking_id": len(bookings), "user_id": participant})
+                participants_partner.append({"booking_id": len(bookings), "partner_id": rng.randint(1, partners)})
+                claims.extend(claim_rows(len(bookings), room, when, start, start + duration))
+
+    db.session.execute(sa.insert(Booking), bookings)
+    db.session.execute(sa.insert(CostLog), logs)
+    db.session.execute(sa.insert(ParticipantsUser), participants_user)
+    db.session.execute(sa.insert(ParticipantsPartner), participants_partner)
+    db.session.execute(sa.insert(SlotClaim), claims)
+    db.session.commit()
+    rebuild_cost_rollup()
+    return first_day
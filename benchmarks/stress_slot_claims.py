@@ -0,0 +1,118 @@
+"""Hammer a few room-days with overlapping bookings from many workers.
+
+    python benchmarks/stress_slot_claims.py [processes] [threads] [attempts]
+
+Every process has its own app and booking index, as under a multi-worker
+server, and all of them share one database file. Exits non-zero if any
+two accepted bookings overlap.
+"""
+import multiprocessing
+import random
+import sys
+import threading
+from datetime import date, timedelta
+
+import sqlalchemy as sa
+
+from common import logged_in_client, make_app, seed_sample
+
+ROOMS = 2
+DAYS = 2
+USERS = 20
+
+
+def worker(path, number, threads, attempts, results):
+    app = make_app(path, SQL_SLOW_QUERY_MS=60000)
+    counts = {"accepted": 0, "rejected": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def book(thread):
+        rng = random.Random(number * 1000 + thread)
+        client = logged_in_client(app, 2 + (number * threads + thread) % USERS)
+        for attempt in range(attempts):
+            data = {
+                "title": f"stress {number}-{thread}-{attempt}",
+                "room_id": rng.randint(1, ROOMS),
+                "date": (date.today() + timedelta(days=1 + rng.randrange(DAYS))).strftime("%m/%d/%Y"),
+                "start_time": rng.randrange(9 * 60, 18 * 60 + 1, 15),
+                "duration": rng.randint(1, 12) * 15,
+                "participants_user": [2],
+            }
+            response = client.post("/book", data=data)
+            with client.session_transaction() as session:
+                flashes = [message for _, message in session.pop("_flashes", [])]
+            with lock:
+                if response.status_code != 302:
+                    counts["errors"] += 1
+                elif "Booking success!" in flashes:
+                    counts["accepted"] += 1
+                else:
+                    counts["rejected"] += 1
+
+    pool = [threading.Thread(target=book, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(counts)
+
+
+def double_bookings(app):
+    from app import db
+    from app.models import Booking
+
+    other = sa.orm.aliased(Booking)
+    with app.app_context():
+        return db.session.execute(
+            sa.select(sa.func.count())
+            .select_from(Booking)
+            .join(
+                other,
+                sa.and_(
+                    other.room_id == Booking.room_id,
+                    other.date == Booking.date,
+                    other.id > Booking.id,
+                    other.start_time < Booking.end_time,
+                    Booking.start_time < other.end_time,
+                ),
+            )
+        ).scalar()
+
+
+def main():
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    attempts = int(sys.argv[3]) if len(sys.argv) > 3 else 25
+
+    app = make_app(SQL_SLOW_QUERY_MS=60000)
+    from app import db
+
+    with app.app_context():
+        seed_sample(db, users=USERS, rooms=ROOMS, days=1)
+    path = app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///")
+
+    results = multiprocessing.Queue()
+    pool = [
+        multiprocessing.Process(target=worker, args=(path, number, threads, attempts, results))
+        for number in range(processes)
+    ]
+    for process in pool:
+        process.start()
+    totals = {"accepted": 0, "rejected": 0, "errors": 0}
+    for _ in pool:
+        for key, value in results.get().items():
+            totals[key] += value
+    for process in pool:
+        process.join()
+
+    overlaps = double_bookings(app)
+    print(
+        f"{processes} processes x {threads} threads x {attempts} attempts on {ROOMS} rooms x {DAYS} days: "
+        f"{totals['accepted']} accepted, {totals['rejected']} rejected, {totals['errors']} errors, "
+        f"{overlaps} double bookings"
+    )
+    return 1 if overlaps or totals["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,4 +4,59 @@ class Config(object):
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
         'sqlite:///' + os.path.join(basedir, 'lab2.db')
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
\ No newline at end of file
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool shared by the threads of one worker process; dropped
+    # for an in-memory database, which has a single connection
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': 10,
+    }
+    # Views marked @read_only use a separate pool of mode=ro connections
+    # to the same SQLite file; writes always go to the primary engine
+    DB_READ_SPLIT = os.environ.get('DB_READ_SPLIT', '1') == '1'
+    DB_READ_POOL_SIZE = int(os.environ.get('DB_READ_POOL_SIZE', 10))
+    # Applied to every new SQLite connection; WAL lets readers proceed
+    # while a booking is being written
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    }
+    # Times a writing view is re-run after SQLITE_BUSY
+    SQLITE_BUSY_RETRIES = 5
+    # Flask-Login user records cached per worker process
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    # Rendered room occupation/availability fragments; use 'sqlite' to
+    # share one store between worker processes
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')
+    FRAGMENT_CACHE_PATH = os.environ.get('FRAGMENT_CACHE_PATH') or \
+        os.path.join(basedir, 'fragments.db')
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 256))
+    # Seconds between reads of the booking change log by the live
+    # occupancy feed, and between keep-alives sent to idle subscribers
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 1))
+    EVENTS_HEARTBEAT = 15
+    # Updates buffered per subscriber before a slow one is disconnected
+    EVENTS_QUEUE_SIZE = 100
+    # Statements logged as slow, and times one statement may repeat within
+    # a request before it is reported as a likely N+1
+    SQL_SLOW_QUERY_MS = int(os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+    # Bearer token accepted by /metrics in place of an admin session
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Bookings and cost logs older than this many days are moved to the
+    # archive tables by `flask archive`; reports read them back as needed
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+    ARCHIVE_BATCH_SIZE = 1000
+    # Load Flask-Migrate for the `flask db` commands; web workers set
+    # REGISTER_MIGRATE=0 to skip importing alembic
+    REGISTER_MIGRATE = os.environ.get('REGISTER_MIGRATE', '1') == '1'
+    # Jinja bytecode cache shared by worker processes; fill it at deploy
+    # time with `flask compile-templates`. Unset, templates are compiled
+    # in each worker on first use.
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR')
@@ -0,0 +1,125 @@
+"""baseline schema
+
+Revision ID: 1e6b0d9a4c27
+Revises: 
+Create Date: 2026-10-18 09:58:13.840265
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1e6b0d9a4c27'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# The tables as the first version of the app created them; databases
+# created before the migrations existed already have them, hence
+# if_not_exists.
+
+
+def upgrade():
+    op.create_table(
+        'team',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'business_partner',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('representing', sa.String(length=64), nullable=False),
+        sa.Column('position', sa.String(length=64), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'room',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('capacity', sa.Integer(), nullable=False),
+        sa.Column('telephone', sa.String(length=20), nullable=True),
+        sa.Column('projector', sa.Boolean(), nullable=True),
+        sa.Column('whiteboard', sa.Boolean(), nullable=True),
+        sa.Column('cost', sa.Integer(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'cost_log',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('team_name', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('cost', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=64), nullable=False),
+        sa.Column('fullname', sa.String(length=64), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=False),
+        sa.Column('position', sa.String(length=64), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['team_id'], ['team.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'booking',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('start_time', sa.Integer(), nullable=False),
+        sa.Column('end_time', sa.Integer(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['room_id'], ['room.id']),
+        sa.ForeignKeyConstraint(['team_id'], ['team.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('title'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'participants_user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_title', sa.String(length=64), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_title'], ['booking.title']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+    op.create_table(
+        'participants_partner',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_title', sa.String(length=64), nullable=True),
+        sa.Column('partner_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_title'], ['booking.title']),
+        sa.ForeignKeyConstraint(['partner_id'], ['business_partner.id']),
+        sa.PrimaryKeyConstraint('id'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('participants_partner')
+    op.drop_table('participants_user')
+    op.drop_table('booking')
+    op.drop_table('user')
+    op.drop_table('cost_log')
+    op.drop_table('room')
+    op.drop_table('business_partner')
+    op.drop_table('team')
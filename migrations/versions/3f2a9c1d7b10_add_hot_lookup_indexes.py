@@ -0,0 +1,37 @@
+"""add indexes for hot lookups
+
+Revision ID: 3f2a9c1d7b10
+Revises: 1e6b0d9a4c27
+Create Date: 2026-10-18 10:12:41.306511
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b10'
+down_revision = '1e6b0d9a4c27'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns); databases created by populate.py already
+# have them, hence if_not_exists.
+INDEXES = [
+    ('ix_booking_date_room_id', 'booking', ['date', 'room_id']),
+    ('ix_booking_user_id_date', 'booking', ['user_id', 'date']),
+    ('ix_booking_team_id_date', 'booking', ['team_id', 'date']),
+    ('ix_cost_log_date', 'cost_log', ['date']),
+    ('ix_cost_log_title', 'cost_log', ['title']),
+    ('ix_participants_user_booking_title', 'participants_user', ['booking_title']),
+    ('ix_participants_partner_booking_title', 'participants_partner', ['booking_title']),
+]
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False, if_not_exists=True)
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
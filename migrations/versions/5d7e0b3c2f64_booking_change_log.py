@@ -0,0 +1,40 @@
+"""add the booking change log
+
+Revision ID: 5d7e0b3c2f64
+Revises: 8c41e2d5a9f3
+Create Date: 2026-10-18 16:02:51.118430
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d7e0b3c2f64'
+down_revision = '8c41e2d5a9f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'booking_change',
+        sa.Column('seq', sa.Integer(), nullable=False),
+        sa.Column('action', sa.String(length=16), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('start_time', sa.Integer(), nullable=False),
+        sa.Column('end_time', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('seq'),
+        sqlite_autoincrement=True,
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('booking_change')
@@ -0,0 +1,54 @@
+"""key participant tables by booking id
+
+Revision ID: 8c41e2d5a9f3
+Revises: 3f2a9c1d7b10
+Create Date: 2026-10-18 14:37:09.552017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c41e2d5a9f3'
+down_revision = '3f2a9c1d7b10'
+branch_labels = None
+depends_on = None
+
+TABLES = ['participants_user', 'participants_partner']
+
+
+def upgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('booking_id', sa.Integer(), nullable=True))
+        op.execute(
+            f'UPDATE {table} SET booking_id = '
+            f'(SELECT booking.id FROM booking WHERE booking.title = {table}.booking_title)'
+        )
+        # rows pointing at bookings that no longer exist cannot be converted
+        op.execute(f'DELETE FROM {table} WHERE booking_id IS NULL')
+
+        op.drop_index(f'ix_{table}_booking_title', table_name=table, if_exists=True)
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.alter_column('booking_id', existing_type=sa.Integer(), nullable=False)
+            batch_op.drop_column('booking_title')
+            batch_op.create_foreign_key(
+                f'fk_{table}_booking_id', 'booking', ['booking_id'], ['id'], ondelete='CASCADE'
+            )
+            batch_op.create_index(f'ix_{table}_booking_id', ['booking_id'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        op.add_column(table, sa.Column('booking_title', sa.String(length=64), nullable=True))
+        op.execute(
+            f'UPDATE {table} SET booking_title = '
+            f'(SELECT booking.title FROM booking WHERE booking.id = {table}.booking_id)'
+        )
+        op.drop_index(f'ix_{table}_booking_id', table_name=table)
+        with op.batch_alter_table(table, recreate='always') as batch_op:
+            batch_op.drop_column('booking_id')
+            batch_op.create_foreign_key(
+                f'fk_{table}_booking_title', 'booking', ['booking_title'], ['title']
+            )
+            batch_op.create_index(f'ix_{table}_booking_title', ['booking_title'], unique=False)
@@ -0,0 +1,63 @@
+"""add slot claims for race-free booking
+
+Revision ID: a4b9c6e1d852
+Revises: 5d7e0b3c2f64
+Create Date: 2026-10-18 17:21:04.640912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4b9c6e1d852'
+down_revision = '5d7e0b3c2f64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'slot_claim',
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('slot', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['room_id'], ['room.id']),
+        sa.ForeignKeyConstraint(['booking_id'], ['booking.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('room_id', 'date', 'slot'),
+    )
+    op.create_index('ix_slot_claim_booking_id', 'slot_claim', ['booking_id'], unique=False)
+    # Databases filled by the first populate.py hold times as text such as
+    # '1900-01-01 09:00:00'; turn them into hours, rounding the end up
+    start = "CAST(strftime('%H', start_time) AS INTEGER)"
+    end = "CAST(strftime('%H', end_time) AS INTEGER) + (strftime('%M%S', end_time) != '0000')"
+    op.execute(
+        f"UPDATE booking SET start_time = {start}, end_time = {end}, duration = {end} - {start}"
+        " WHERE typeof(start_time) = 'text' AND strftime('%H', start_time) IS NOT NULL"
+        " AND typeof(end_time) = 'text' AND strftime('%H', end_time) IS NOT NULL"
+    )
+    bad = op.get_bind().execute(sa.text(
+        "SELECT id FROM booking"
+        " WHERE typeof(start_time) != 'integer' OR typeof(end_time) != 'integer'"
+    )).scalars().all()
+    if bad:
+        raise RuntimeError(
+            f'booking times are not whole hours, fix or delete bookings {bad} and retry'
+        )
+    # One claim per booked hour; of bookings that already overlap, the
+    # first one keeps the slot
+    op.execute(
+        'WITH RECURSIVE hours (booking_id, room_id, date, slot, end_time) AS ('
+        ' SELECT id, room_id, date, start_time, end_time FROM booking'
+        ' WHERE 0 <= start_time AND start_time < end_time'
+        ' UNION ALL'
+        ' SELECT booking_id, room_id, date, slot + 1, end_time FROM hours WHERE slot + 1 < end_time AND slot + 1 < 24'
+        ') INSERT OR IGNORE INTO slot_claim (room_id, date, slot, booking_id)'
+        ' SELECT room_id, date, slot, booking_id FROM hours ORDER BY booking_id'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_slot_claim_booking_id', table_name='slot_claim')
+    op.drop_table('slot_claim')
@@ -0,0 +1,86 @@
+"""archive tables for old bookings, cost logs and participants
+
+Revision ID: b2c8d4e6f0a1
+Revises: e7f1a2b3c4d5
+Create Date: 2026-10-18 20:12:04.531870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2c8d4e6f0a1'
+down_revision = 'e7f1a2b3c4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'booking_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('room_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('start_time', sa.Integer(), nullable=False),
+        sa.Column('end_time', sa.Integer(), nullable=False),
+        sa.Column('duration', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_booking_archive_date_room_id', 'booking_archive', ['date', 'room_id'])
+    op.create_index('ix_booking_archive_team_id_date', 'booking_archive', ['team_id', 'date'])
+
+    op.create_table(
+        'cost_log_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('team_name', sa.String(length=64), nullable=False),
+        sa.Column('title', sa.String(length=64), nullable=True),
+        sa.Column('date', sa.DateTime(), nullable=True),
+        sa.Column('cost', sa.Integer(), nullable=False),
+    )
+    op.create_index('ix_cost_log_archive_date', 'cost_log_archive', ['date'])
+
+    op.create_table(
+        'participants_user_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+    )
+    op.create_index(
+        'ix_participants_user_archive_booking_id', 'participants_user_archive', ['booking_id']
+    )
+
+    op.create_table(
+        'participants_partner_archive',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('partner_id', sa.Integer(), nullable=True),
+    )
+    op.create_index(
+        'ix_participants_partner_archive_booking_id', 'participants_partner_archive', ['booking_id']
+    )
+
+
+def downgrade():
+    # Archived rows go back to the live tables before the archive is dropped
+    for table, columns in (
+        ('booking', 'id, title, team_id, room_id, user_id, date, start_time, end_time, duration'),
+        ('cost_log', 'id, team_id, team_name, title, date, cost'),
+        ('participants_user', 'id, booking_id, user_id'),
+        ('participants_partner', 'id, booking_id, partner_id'),
+    ):
+        op.execute(
+            f'INSERT OR IGNORE INTO {table} ({columns}) SELECT {columns} FROM {table}_archive'
+        )
+    op.drop_index('ix_participants_partner_archive_booking_id', table_name='participants_partner_archive')
+    op.drop_table('participants_partner_archive')
+    op.drop_index('ix_participants_user_archive_booking_id', table_name='participants_user_archive')
+    op.drop_table('participants_user_archive')
+    op.drop_index('ix_cost_log_archive_date', table_name='cost_log_archive')
+    op.drop_table('cost_log_archive')
+    op.drop_index('ix_booking_archive_team_id_date', table_name='booking_archive')
+    op.drop_index('ix_booking_archive_date_room_id', table_name='booking_archive')
+    op.drop_table('booking_archive')
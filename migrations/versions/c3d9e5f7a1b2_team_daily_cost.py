@@ -0,0 +1,49 @@
+"""add the per-team daily cost rollup
+
+Revision ID: c3d9e5f7a1b2
+Revises: b2c8d4e6f0a1
+Create Date: 2026-10-19 09:14:52.108337
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3d9e5f7a1b2'
+down_revision = 'b2c8d4e6f0a1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() already have the table
+    op.create_table(
+        'team_daily_cost',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('team_id', sa.Integer(), nullable=False),
+        sa.Column('team_name', sa.String(length=64), nullable=False),
+        sa.Column('date', sa.DateTime(), nullable=False),
+        sa.Column('cost', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('team_id', 'date'),
+        if_not_exists=True,
+    )
+    op.create_index(
+        'ix_team_daily_cost_date', 'team_daily_cost', ['date'], unique=False, if_not_exists=True
+    )
+    # Backfill from the live and archived cost logs, unless already filled
+    op.execute(
+        'INSERT INTO team_daily_cost (team_id, team_name, date, cost)'
+        ' SELECT team_id, max(team_name), date, sum(cost) FROM ('
+        ' SELECT team_id, team_name, date, cost FROM cost_log'
+        ' UNION ALL SELECT team_id, team_name, date, cost FROM cost_log_archive'
+        ') WHERE date IS NOT NULL'
+        ' AND NOT EXISTS (SELECT 1 FROM team_daily_cost)'
+        ' GROUP BY team_id, date'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_team_daily_cost_date', table_name='team_daily_cost')
+    op.drop_table('team_daily_cost')
@@ -0,0 +1,31 @@
+"""add table version counters for the cached form choices
+
+Revision ID: d4e0f6a8b2c3
+Revises: c3d9e5f7a1b2
+Create Date: 2026-10-19 09:41:26.730914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4e0f6a8b2c3'
+down_revision = 'c3d9e5f7a1b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created with db.create_all() already have the table
+    op.create_table(
+        'table_version',
+        sa.Column('name', sa.String(length=64), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+        if_not_exists=True,
+    )
+
+
+def downgrade():
+    op.drop_table('table_version')
@@ -0,0 +1,25 @@
+"""index the booking change log by date
+
+Revision ID: e5f1a7b9c3d4
+Revises: d4e0f6a8b2c3
+Create Date: 2026-10-19 10:22:08.419263
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1a7b9c3d4'
+down_revision = 'd4e0f6a8b2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_booking_change_date', 'booking_change', ['date'], unique=False, if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index('ix_booking_change_date', table_name='booking_change')
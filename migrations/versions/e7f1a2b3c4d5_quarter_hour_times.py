@@ -0,0 +1,47 @@
+"""store booking times in minutes, claim quarter-hour slots
+
+Revision ID: e7f1a2b3c4d5
+Revises: a4b9c6e1d852
+Create Date: 2026-10-18 18:45:37.207519
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7f1a2b3c4d5'
+down_revision = 'a4b9c6e1d852'
+branch_labels = None
+depends_on = None
+
+
+def reclaim(slot_minutes):
+    # Rebuild the slot claims of every booking at the given slot length
+    op.execute('DELETE FROM slot_claim')
+    op.execute(
+        'WITH RECURSIVE slots (booking_id, room_id, date, slot, last) AS ('
+        f' SELECT id, room_id, date, start_time / {slot_minutes},'
+        f' (end_time + {slot_minutes} - 1) / {slot_minutes} - 1'
+        ' FROM booking WHERE start_time < end_time'
+        ' UNION ALL'
+        ' SELECT booking_id, room_id, date, slot + 1, last FROM slots WHERE slot < last'
+        ') INSERT OR IGNORE INTO slot_claim (room_id, date, slot, booking_id)'
+        ' SELECT room_id, date, slot, booking_id FROM slots ORDER BY booking_id'
+    )
+
+
+def upgrade():
+    # Times were whole hours
+    op.execute('UPDATE booking SET start_time = start_time * 60, end_time = end_time * 60, duration = duration * 60')
+    op.execute('UPDATE booking_change SET start_time = start_time * 60, end_time = end_time * 60')
+    reclaim(15)
+
+
+def downgrade():
+    # Times off the hour are widened to whole hours
+    op.execute(
+        'UPDATE booking SET start_time = start_time / 60, end_time = (end_time + 59) / 60,'
+        ' duration = (end_time + 59) / 60 - start_time / 60'
+    )
+    op.execute('UPDATE booking_change SET start_time = start_time / 60, end_time = (end_time + 59) / 60')
+    reclaim(1)
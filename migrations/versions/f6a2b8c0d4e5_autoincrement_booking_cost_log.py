@@ -0,0 +1,42 @@
+"""never reuse booking and cost log ids
+
+Revision ID: f6a2b8c0d4e5
+Revises: e5f1a7b9c3d4
+Create Date: 2026-10-19 14:05:51.902716
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6a2b8c0d4e5'
+down_revision = 'e5f1a7b9c3d4'
+branch_labels = None
+depends_on = None
+
+TABLES = ['booking', 'cost_log']
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(
+            table, recreate='always', table_kwargs={'sqlite_autoincrement': True}
+        ):
+            pass
+        # New ids continue above the archived ones as well as the live ones
+        op.execute(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table}', 0"
+            f" WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = '{table}')"
+        )
+        op.execute(
+            f'UPDATE sqlite_sequence SET seq = max(seq,'
+            f' coalesce((SELECT max(id) FROM {table}), 0),'
+            f' coalesce((SELECT max(id) FROM {table}_archive), 0))'
+            f" WHERE name = '{table}'"
+        )
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table, recreate='always'):
+            pass
@@ -1,65 +1,269 @@
-from app import create_app, db
-from app.models import User, Team, Room, Booking
+"""Recreate the database and fill it with deterministic dummy data.
+
+    python populate.py                      # small demo data set
+    python populate.py --rooms 500 --days 365 --bookings-per-room-day 6
+
+Bookings of a room never overlap. Bookings start today unless
+--start-date is given; with it, the same options and seed always produce
+the same rows. Rows are written with batched Core inserts and the
+secondary indexes are built after loading.
+"""
+import argparse
+import os
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import sqlalchemy as sa
+from flask import current_app
 from werkzeug.security import generate_password_hash
-from datetime import datetime, date, time
 
+from app import create_app, db
+from app.choice_cache import bump
+from app.costs import rebuild_cost_rollup
+from app.occupancy import DAY_END, DAY_START, LAST_START, SLOT_MINUTES
+from app.models import (
+    Booking,
+    BusinessPartner,
+    CostLog,
+    ParticipantsPartner,
+    ParticipantsUser,
+    Room,
+    SlotClaim,
+    Team,
+    User,
+)
+from app.slot_claims import claim_rows
+
+# Quarter-hour start times offered by the booking form, in minutes
+START_TIMES = range(DAY_START, LAST_START + 1, SLOT_MINUTES)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=2)
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--rooms", type=int, default=2)
+    parser.add_argument("--partners", type=int, default=2)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--bookings-per-room-day", type=int, default=1)
+    parser.add_argument("--participants-per-booking", type=int, default=2)
+    parser.add_argument(
+        "--start-date",
+        type=date.fromisoformat,
+        help="first booked day, YYYY-MM-DD (default: today); fix it for reproducible rows",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=50000)
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.bookings_per_room_day <= len(START_TIMES):
+        parser.error(f"--bookings-per-room-day must be between 0 and {len(START_TIMES)}")
+    if args.teams < 1 or args.users < 1 or args.rooms < 1:
+        parser.error("--teams, --users and --rooms must be at least 1")
+    args.participants_per_booking = min(args.participants_per_booking, args.users)
+    args.start_date = args.start_date or date.today()
+    return args
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def room_day_bookings(rng, count):
+    # `count` non-overlapping (start, end) pairs within one day, in minutes
+    starts = sorted(rng.sample(START_TIMES, count))
+    ends = starts[1:] + [DAY_END]
+    return [
+        (start, min(start + rng.randint(1, 12) * SLOT_MINUTES, end)) for start, end in zip(starts, ends)
+    ]
+
+
+def generate(args, room_costs, team_names):
+    # Yields (booking, cost log, user participants, partner participants, slot claims)
+    rng = random.Random(args.seed)
+    booking_id = 0
+    for day in range(args.days):
+        when = datetime.combine(args.start_date + timedelta(days=day), datetime.min.time())
+        for room_id in range(1, args.rooms + 1):
+            for start, end in room_day_bookings(rng, args.bookings_per_room_day):
+                booking_id += 1
+                # user ids start at 2, after the admin
+                user_id = 2 + rng.randrange(args.users)
+                team_id = 2 + (user_id - 2) % args.teams
+                title = f"Meeting {booking_id}"
+                yield (
+                    {
+                        "id": booking_id,
+                        "title": title,
+                        "team_id": team_id,
+                        "room_id": room_id,
+                        "user_id": user_id,
+                        "date": when,
+                        "start_time": start,
+                        "end_time": end,
+                        "duration": end - start,
+                    },
+                    {
+                        "title": title,
+                        "team_id": team_id,
+                        "team_name": team_names[team_id],
+                        "date": when,
+                        "cost": round(room_costs[room_id] * (end - start) / 60),
+                    },
+                    [
+                        {"booking_id": booking_id, "user_id": 2 + participant}
+                        for participant in rng.sample(range(args.users), args.participants_per_booking)
+                    ],
+                    [{"booking_id": booking_id, "partner_id": 1 + rng.randrange(args.partners)}]
+                    if args.partners and rng.random() < 0.5
+                    else [],
+                    claim_rows(booking_id, room_id, when, start, end),
+                )
 
-app = create_app()
 
-with app.app_context():
-    # Drop all existing tables
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def stamp_head():
+    # create_all() builds the newest schema; record that so a later
+    # `flask db upgrade` does not replay the migrations on top of it
+    from flask_migrate import Migrate, stamp
+
+    if "migrate" not in current_app.extensions:
+        Migrate(current_app, db)
+    stamp(directory=MIGRATIONS, revision="head", purge=True)
+
+
+@contextmanager
+def unsynchronised(engine):
+    # A transaction on a connection with PRAGMA synchronous=OFF. The pragma
+    # cannot change inside a transaction, and the pooled connection gets
+    # its previous setting back before it is reused.
+    with engine.connect() as connection:
+        previous = connection.exec_driver_sql("PRAGMA synchronous").scalar()
+        connection.exec_driver_sql("PRAGMA synchronous=OFF")
+        connection.commit()
+        try:
+            with connection.begin():
+                yield connection
+        finally:
+            connection.exec_driver_sql(f"PRAGMA synchronous={previous}")
+            connection.commit()
+
+
+def populate(args):
+    rng = random.Random(args.seed)
+    password_hash = generate_password_hash("password123")
+
     db.drop_all()
-    # Create new tables
     db.create_all()
+    stamp_head()
 
-    # Example teams
-    team1 = Team(name="Development")
-    team2 = Team(name="Marketing")
-    db.session.add_all([team1, team2])
-    db.session.commit()
+    with unsynchronised(db.engine) as connection:
+        # Load into bare tables and build the secondary indexes once at the end
+        indexes = [index for table in db.metadata.sorted_tables for index in table.indexes]
+        for index in indexes:
+            index.drop(connection)
 
-    # Example users
-    user1 = User(
-        username="alice",
-        fullname="Alice Smith",
-        position="Developer",
-        team_id=team1.id,
-        password_hash=generate_password_hash("password123"),
-    )
-    user2 = User(
-        username="bob",
-        fullname="Bob Jones",
-        position="Marketer",
-        team_id=team2.id,
-        password_hash=generate_password_hash("securepass"),
-    )
+        teams = {1: "Admin"}
+        teams.update({2 + i: f"Team {i + 1}" for i in range(args.teams)})
+        connection.execute(sa.insert(Team), [{"id": i, "name": name} for i, name in teams.items()])
+        connection.execute(
+            sa.insert(User),
+            [
+                {
+                    "id": 1,
+                    "username": "admin",
+                    "fullname": "Administrator",
+                    "position": "Administrator",
+                    "team_id": 1,
+                    "password_hash": generate_password_hash("admin"),
+                }
+            ]
+            + [
+                {
+                    "id": 2 + i,
+                    "username": f"user{i + 1}",
+                    "fullname": f"User {i + 1}",
+                    "position": rng.choice(["Developer", "Designer", "Manager", "Marketer"]),
+                    "team_id": 2 + i % args.teams,
+                    "password_hash": password_hash,
+                }
+                for i in range(args.users)
+            ],
+        )
+        rooms = [
+            {
+                "id": 1 + i,
+                "name": f"Room {i + 1}",
+                "capacity": rng.choice([4, 6, 8, 12, 20]),
+                "telephone": f"555-{1000 + i}" if rng.random() < 0.5 else None,
+                "projector": rng.random() < 0.5,
+                "whiteboard": rng.random() < 0.7,
+                "cost": rng.choice([10, 20, 30, 50]),
+            }
+            for i in range(args.rooms)
+        ]
+        connection.execute(sa.insert(Room), rooms)
+        if args.partners:
+            connection.execute(
+                sa.insert(BusinessPartner),
+                [
+                    {"id": 1 + i, "name": f"Partner {i + 1}", "representing": f"Company {i % 50 + 1}", "position": "Sales"}
+                    for i in range(args.partners)
+                ],
+            )
 
-    db.session.add_all([user1, user2])
-    db.session.commit()
+        counts = dict.fromkeys(("bookings", "participants"), 0)
+        room_costs = {room["id"]: room["cost"] for room in rooms}
+        for batch in batched(generate(args, room_costs, teams), args.batch_size):
+            bookings, logs, users, partners, claims = zip(*batch)
+            connection.execute(sa.insert(Booking), list(bookings))
+            connection.execute(sa.insert(CostLog), list(logs))
+            users = [row for rows in users for row in rows]
+            partners = [row for rows in partners for row in rows]
+            if users:
+                connection.execute(sa.insert(ParticipantsUser), users)
+            if partners:
+                connection.execute(sa.insert(ParticipantsPartner), partners)
+            connection.execute(sa.insert(SlotClaim), [row for rows in claims for row in rows])
+            counts["bookings"] += len(bookings)
+            counts["participants"] += len(users) + len(partners)
+            print(f"  {counts['bookings']} bookings", end="\r", flush=True)
+        print()
 
-    # Example rooms
-    room1 = Room(name="Room A", capacity=10, telephone="123-456-7890")
-    room2 = Room(name="Room B", capacity=20, telephone="987-654-3210")
-    db.session.add_all([room1, room2])
+        for index in indexes:
+            index.create(connection)
+
+    rebuild_cost_rollup()
+    # Invalidate form choices cached by running workers
+    bump("team", "user", "room", "business_partner", "booking", "participants_user", "participants_partner")
     db.session.commit()
+    return counts
+
 
-    start_time = datetime.strptime("09:00", "%H:%M")
-    end_time = datetime.strptime("10:00", "%H:%M")
-    duration = (end_time - start_time).seconds // 60  # duration in minutes
-
-    # Optional: example booking
-    booking = Booking(
-        title="Team Sync",
-        user_id=user1.id,
-        room_id=room1.id,
-        team_id=team1.id,
-        date=date(2025, 5, 20),
-        start_time=start_time,
-        end_time=end_time,
-        duration=duration
+def main(argv=None):
+    args = parse_args(argv)
+    app = create_app()
+    with app.app_context():
+        started = time.perf_counter()
+        counts = populate(args)
+        elapsed = time.perf_counter() - started
+    print(
+        f"Database recreated with {args.teams} teams, {args.users} users, {args.rooms} rooms, "
+        f"{args.partners} partners, {counts['bookings']} bookings and "
+        f"{counts['participants']} participants in {elapsed:.1f}s"
     )
 
-    db.session.add(booking)
-    db.session.commit()
 
-    print("✅ Database successfully recreated and populated.")
+if __name__ == "__main__":
+    main()